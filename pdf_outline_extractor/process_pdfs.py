@@ -1,90 +1,1212 @@
 import os
 import sys
 import json
+import time
+import argparse
+import asyncio
+import contextlib
+import fnmatch
+import hashlib
+import io
+import platform
+import random
+import signal
+import statistics
+import sqlite3
+import weakref
 import fitz
 import re
-from collections import Counter
+from collections import Counter, namedtuple
+from functools import cached_property, lru_cache
+from operator import attrgetter, itemgetter
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 
 MIN_HEADING_LENGTH = 4
 MAX_HEADING_WORD_COUNT = 25
 MIN_FONT_SIZE_DIFFERENCE_RATIO = 1.1
+PAGE_PARALLEL_MIN_PAGES = 200
+PAGE_PARALLEL_MIN_CHUNK = 25
+DEFAULT_CACHE_MAX_BYTES = 1 << 30
+AHO_CORASICK_MIN_PATTERNS = 64
+DEFAULT_STREAM_NAME = "document.pdf"
+EXTERNAL_OUTPUT_DIR = "_external"
+LOW_MEMORY_STORE_BYTES = 64 << 20
+DEFAULT_SERVICE_PORT = 8765
+DEFAULT_SERVICE_MAX_QUEUE = 256
+DEFAULT_SERVICE_MAX_BODY = 256 << 20
+SERVICE_STUCK_GRACE_SECONDS = 5.0
+FLAG_VALUES = {"1": True, "true": True, "yes": True, "on": True,
+               "0": False, "false": False, "no": False, "off": False}
+TOC_MIN_ENTRIES = 2
+TOC_MIN_ORDERED_FRACTION = 0.9
+TOC_VERIFY_SAMPLE = 3
+TOC_MAX_LEVEL = 4
+TITLE_REGION_HEIGHT = 300
+TITLE_CLIP_MARGIN = 120
+TITLE_CONFIDENT_SIZE_RATIO = 1.5
+STYLE_HEADING_MAX_LINE_CHARS = 80
+STYLE_HEADING_MIN_LINES = 2
+STYLE_LEVELS = ("H1", "H2", "H3", "H4")
+GENERIC_TITLE_PREFIXES = ("microsoft word", "adobe acrobat", "untitled", "document")
+GENERIC_TITLE_SUFFIX_RE = re.compile(r'\.(?:docx?|pdf|cdr|indd|pptx?|xlsx?|rtf|txt|qxd)$')
+
+# Bump whenever a heuristic change alters output, so cached results are not reused.
+EXTRACTOR_VERSION = "7"
+
+_MONTH = r'(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*'
+
+# One pass over a line: an optional lookahead records whether the whole (stripped) line is a
+# date or page number, then the numbering prefix alternatives are tried in the order the
+# level rules check them. At most one alternative can match a given line.
+LINE_CLASSIFIER_RE = re.compile(
+    r'(?:(?=\s*(?P<date>'
+    r'\d{1,2}[-/]\d{1,2}[-/]\d{2,4}'
+    r'|\d{4}'
+    r'|' + _MONTH + r'\s+\d{1,2},?\s+\d{4}'
+    r'|\d{1,2}\s+' + _MONTH + r'\s+\d{4}'
+    r'|(?:page|p\.?)\s*\d+'
+    r')\s*\Z))?'
+    r'(?:(?P<section>\d+)\.\s+'
+    r'|(?P<subsection>\d+\.\d+)\s+'
+    r'|(?P<subsubsection>\d+\.\d+\.\d+)\s+'
+    r'|(?P<bare>\d+)\s+)?',
+    re.IGNORECASE,
+)
+WORD_CHAR_RE = re.compile(r'\w')
+NUMBERED_TITLE_RE = re.compile(r'^\d+\.\s+[A-Z][a-z]+')
+# A line of joined page text that starts with any numbering prefix LINE_CLASSIFIER_RE knows,
+# followed by more text on the same line.
+NUMBERED_LINE_START_RE = re.compile(r'^\s*\d+(?:\.\d+)*\.?[^\S\n]+\S', re.MULTILINE)
+
+# numbering group -> (depth, level)
+_NUMBERING_LEVELS = {
+    "section": (1, "H1"),
+    "subsection": (2, "H2"),
+    "subsubsection": (3, "H3"),
+    "bare": (1, "H1"),
+}
+
+LineClass = namedtuple("LineClass", [
+    "is_date_or_page_number", "is_numbered", "numbering_depth", "numbering_level", "remainder_length",
+])
+
+@lru_cache(maxsize=65536)
+def classify_line(text):
+    """Classify a candidate line with a single regex match.
+
+    Returns whether it is a date or page number, whether it is a numbered heading, the
+    numbering depth and level (0/None when unnumbered) and the length of the text after
+    the numbering prefix.
+    """
+    match = LINE_CLASSIFIER_RE.match(text)
+    stripped = text.strip()
+    is_date = (not stripped or match.group("date") is not None or
+               stripped.replace('.', '').replace(' ', '').isdigit())
+
+    numbering = match.lastgroup if match.end() else None
+    if numbering not in _NUMBERING_LEVELS:
+        return LineClass(is_date, False, 0, None, len(stripped))
+
+    remainder = text[match.end():]
+    remainder_length = len(remainder.strip())
+    is_numbered = remainder_length > 3 or (numbering == "section" and WORD_CHAR_RE.match(remainder) is not None)
+    depth, level = _NUMBERING_LEVELS[numbering]
+    return LineClass(is_date, is_numbered, depth, level, remainder_length)
+
+class KeywordTrie:
+    """Character trie answering "does the text start with one of these keywords?" in one walk.
+
+    With whole_word the keyword must be the whole text or be followed by a space.
+    """
+
+    def __init__(self, keywords, whole_word=True):
+        self.whole_word = whole_word
+        self.keywords = tuple(keyword for keyword in keywords if keyword)
+        self.root = {}
+        for keyword in keywords:
+            if not keyword:
+                continue
+            node = self.root
+            for ch in keyword:
+                node = node.setdefault(ch, {})
+            node[None] = True
+
+    def match(self, text):
+        node = self.root
+        for ch in text:
+            if None in node and (not self.whole_word or ch == " "):
+                return True
+            node = node.get(ch)
+            if node is None:
+                return False
+        return None in node
+
+class AhoCorasick:
+    """Aho-Corasick automaton answering "does the text contain any of these substrings?".
+
+    Small pattern sets are faster with str.__contains__, so the automaton is only walked
+    once there are at least AHO_CORASICK_MIN_PATTERNS patterns.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = tuple(dict.fromkeys(pattern for pattern in patterns if pattern))
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [False]
+        for pattern in self.patterns:
+            state = 0
+            for ch in pattern:
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][ch] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(False)
+                state = next_state
+            self._out[state] = True
+
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(ch, 0)
+                self._out[next_state] = self._out[next_state] or self._out[self._fail[next_state]]
+                queue.append(next_state)
+
+    def search(self, text):
+        if len(self.patterns) < AHO_CORASICK_MIN_PATTERNS:
+            return any(pattern in text for pattern in self.patterns)
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                return True
+        return False
+
+# Generic keyword lists; any of them can be replaced from a JSON file via load_keyword_config().
+DEFAULT_KEYWORDS = {
+    # whole-word prefixes that make a line a keyword heading
+    "heading_keywords": [
+        "revision history", "table of contents", "acknowledgements", "introduction",
+        "overview", "summary", "conclusion", "references", "appendix", "glossary", "index",
+        "chapter", "section", "part", "preamble", "membership", "term", "chair", "meetings",
+        "lines of accountability", "financial and administrative policies", "appointment criteria",
+        "abstract", "background", "methodology", "results", "discussion", "bibliography",
+        "contents", "foreword", "preface", "acknowledgments", "executive summary",
+        "timeline", "business outcomes", "content", "trademarks", "documents and web sites",
+        "intended audience", "career paths", "learning objectives", "entry requirements",
+        "structure and course duration", "keeping it current",
+    ],
+    # substrings that make a line a keyword heading
+    "heading_phrases": ["introduction to", "overview of", "critical component", "road map", "ontario"],
+    # substrings that rule a line out as heading text
+    "excluded_fragments": [
+        "http", ".com", ".org", "www.", "filename", "confidential",
+        "this document", "this overview", "professionals who", "junior professional",
+        "the tester should", "assist business", "version", "international software",
+    ],
+    # keyword headings that repeat the document title and are skipped
+    "duplicate_headings": [
+        "introduction to the foundation", "introduction to foundation level agile", "overview of the foundation",
+    ],
+    # prefixes that always get level H1
+    "major_keywords": [
+        "revision history", "table of contents", "acknowledgements", "acknowledgments",
+        "references", "appendix", "abstract", "executive summary", "conclusion",
+        "introduction", "overview", "summary", "background",
+    ],
+    # substrings that always get level H1
+    "major_phrases": ["introduction to", "overview of"],
+}
+
+def build_keyword_matchers(keywords=None):
+    """Compile keyword lists (DEFAULT_KEYWORDS overridden by keywords) into matchers."""
+    lists = dict(DEFAULT_KEYWORDS)
+    lists.update(keywords or {})
+    return {
+        "heading_keywords": KeywordTrie(lists["heading_keywords"]),
+        "heading_phrases": AhoCorasick(lists["heading_phrases"]),
+        "excluded_fragments": AhoCorasick(lists["excluded_fragments"]),
+        "duplicate_headings": AhoCorasick(lists["duplicate_headings"]),
+        "major_keywords": KeywordTrie(lists["major_keywords"], whole_word=False),
+        "major_phrases": AhoCorasick(lists["major_phrases"]),
+    }
+
+@lru_cache(maxsize=None)
+def load_keyword_config(path=None):
+    """Load keyword lists from a JSON object of {list name: [lowercase keywords]}; None gives the defaults."""
+    if path is None:
+        return build_keyword_matchers()
+    with open(path, "r", encoding="utf-8") as f:
+        keywords = json.load(f)
+    unknown = set(keywords) - set(DEFAULT_KEYWORDS)
+    if unknown:
+        raise ValueError(f"Unknown keyword lists in {path}: {', '.join(sorted(unknown))}")
+    return build_keyword_matchers({name: [keyword.lower() for keyword in values] for name, values in keywords.items()})
+
+_COMMON_PAGE_RULES = [
+    {"lower_contains": ["ontario's digital library"], "page": 1},
+    {"lower_contains": ["a critical component"], "page": 1},
+    {"lower_in": ["summary", "timeline:"], "page": 1},
+    {"lower_in": ["background"], "page": 2},
+]
+
+# Built-in rule profiles, in the same JSON-compatible format load_rule_profiles() reads from
+# disk. Every profile is layered over "default"; a document gets the first profile whose
+# "match" criteria hit (file name substring, SHA-256, or first-page text), else "default".
+# The bundled sample documents (file01-file05) are matched by content, never by name.
+#
+#   skip_rules           lines matching any of these are never headings
+#   candidate_rules      first matching rule decides ("accept": true/false); no match rejects
+#   candidate_page_rules first matching rule sets the candidate page, else page - 1
+#   level_rules          first matching rule gives the level of an unnumbered heading
+#   page_rules           first matching rule sets the output page, else page + page_offset
+#   use_embedded_outline use the PDF's bookmarks instead of page scanning when they pass
+#                        the quality check (_is_trustworthy_toc)
+#   style_levels         level unnumbered headings by the document's own font styles
+#                        (StyleIndex), falling back to level_rules for non-heading styles
+#
+# Rule conditions (all must hold): text_in, lower_in, heading_in (ignores a trailing colon),
+# contains, contains_all, lower_contains, min_words, max_words, min_page, max_page,
+# min_font_size, bold, numbered, numbered_title, keyword, major_keyword.
+BUILTIN_RULE_PROFILES = {
+    "default": {
+        "title": None,
+        "json_indent": 4,
+        "heading_suffix": " ",
+        "page_offset": 1,
+        "use_embedded_outline": True,
+        "style_levels": False,
+        "skip_rules": [
+            {"contains_all": ["Libraries", "Ontario"]},
+        ],
+        "candidate_rules": [
+            {"lower_in": ["overview"], "accept": False},
+            {"max_page": 4, "lower_in": ["revision history", "table of contents", "acknowledgements"],
+             "keyword": True, "accept": True},
+            {"max_page": 4, "accept": False},
+            {"numbered": True, "accept": True},
+            {"keyword": True, "accept": True},
+            {"min_font_size": 16, "accept": True},
+            {"min_font_size": 14, "bold": True, "accept": True},
+        ],
+        "candidate_page_rules": [],
+        "level_rules": [
+            {"major_keyword": True, "level": "H1"},
+            {"min_font_size": 14, "level": "H1"},
+            {"min_font_size": 12, "level": "H2"},
+            {"bold": True, "level": "H2"},
+            {"min_font_size": 10, "level": "H3"},
+        ],
+        "page_rules": [],
+        "common_page_rules": _COMMON_PAGE_RULES,
+    },
+    # Never matched automatically; choose it with --profile styled.
+    "styled": {
+        "style_levels": True,
+    },
+    "file01": {
+        "match": {"sha256": ["cb1f8cb5be4e9d124b1ef51b194c6212515d62469cbf28f7edac291b14ab9a3f"]},
+        "title": "Application form for grant of LTC advance  ",
+        "use_embedded_outline": False,
+        "page_offset": 0,
+    },
+    "file02": {
+        "match": {"sha256": ["837f42b5d85796184625371fabb1b617d5e2f15793b22305f1cf8526f7de63fa"]},
+        "title": "Overview  Foundation Level Extensions  ",
+        "use_embedded_outline": False,
+        "page_offset": 0,
+    },
+    "file03": {
+        "match": {"sha256": ["2003dc1f58e41d2a1d05394cd3a48bf1253ae7eafa0c45179ca2cacfcff8dbcf"]},
+        "title": "RFP:Request for Proposal To Present a Proposal for Developing the Business Plan for the Ontario Digital Library  ",
+        "use_embedded_outline": False,
+        "candidate_rules": [
+            {"contains": [
+                "March 21, 2003", "RFP: Request f", "RFP: R", "quest f", "r Pr", "oposal",
+                "To Present a Proposal for Developing", "the Business Plan for the Ontario",
+                "Those firms/consultants", "Proposals may be", "Contracts with the firm",
+                "commence as soon as possible", "This business plan must be",
+                "later than September 30, 2003", "Those proposals that are short-listed",
+                "of April 28, 2003", "interview will be expected", "St., Suite 303",
+                "April 21, 2003", "lmoore@accessola.com", "mridley@uoguelph.ca",
+                "Working Together", "Ontario's Libraries",
+            ], "accept": False},
+            {"text_in": ["Digital Library"], "accept": False},
+            {"min_words": 16, "accept": False},
+            {"contains": [
+                "2007. The planning process must also secure",
+                "developing a detailed business plan for the three-year",
+                "consulting with and reporting to stakeholder communities",
+                "defining terms of reference and resource parameters",
+                "securing commitment from library, government, and institutional",
+                "undertaking advocacy efforts to promote the ODL",
+                "Ontario Library Association representative (ex-officio)",
+                "It is anticipated that as planning for the ODL evolves",
+                "The Steering Committee is accountable to the Province",
+                "The role of the Ontario Library Association is to assume",
+                "The Steering Committee is accountable to its constituent groups",
+                "Service on the Steering Committee is non-remunerative",
+                "Travel and meeting expenses for Steering Committee members",
+            ], "accept": False},
+            {"heading_in": [
+                "ontario's digital library", "ontario’s digital library",
+                "a critical component for implementing ontario's road map to prosperity strategy",
+                "a critical component for implementing ontario's road map to",
+                "summary", "timeline:", "background", "equitable access for all ontarians:",
+                "shared decision-making and accountability:", "shared governance structure:",
+                "shared funding:", "local points of entry:", "access:", "guidance and advice:", "training:",
+                "provincial purchasing & licensing:", "technological support:",
+                "what could the odl really mean?", "for each ontario citizen it could mean:",
+                "for each ontario student it could mean:", "for each ontario library it could mean:",
+                "for the ontario government it could mean:", "the business plan to be developed",
+                "milestones", "approach and specific proposal requirements",
+                "evaluation and awarding of contract", "appendix a: odl envisioned phases & funding",
+                "phase i: business planning", "phase ii: implementing and transitioning",
+                "phase iii: operating and growing the odl",
+                "appendix b: odl steering committee terms of reference",
+                "1. preamble", "2. terms of reference", "3. membership",
+                "4. appointment criteria and process", "5. term", "6. chair", "7. meetings",
+                "8. lines of accountability and communication", "9. financial and administrative policies",
+                "appendix c: odl's envisioned electronic resources",
+            ], "accept": True},
+            {"heading_in": ["prosperity strategy"], "accept": False},
+            {"numbered_title": True, "max_words": 3, "accept": True},
+            {"min_font_size": 15, "accept": True},
+        ],
+        "candidate_page_rules": [
+            {"min_page": 2, "max_page": 2,
+             "lower_contains": ["ontario's digital library", "a critical component", "summary", "timeline"],
+             "page": 1},
+            {"min_page": 3, "max_page": 3, "lower_contains": ["background"], "page": 2},
+        ],
+        "level_rules": [
+            {"lower_contains": [
+                "ontario's digital library", "ontario’s digital library",
+                "a critical component for implementing ontario's road map to",
+            ], "level": "H1"},
+            {"lower_contains": [
+                "summary", "background", "the business plan to be developed",
+                "what could the odl really mean?", "approach and specific proposal requirements",
+                "evaluation and awarding of contract", "appendix a: odl envisioned phases & funding",
+                "appendix b: odl steering committee terms of reference",
+                "appendix c: odl's envisioned electronic resources",
+            ], "level": "H2"},
+            {"lower_contains": [
+                "timeline:", "equitable access for all ontarians:", "shared decision-making and accountability:",
+                "shared governance structure:", "shared funding:", "local points of entry:",
+                "access:", "guidance and advice:", "training:", "provincial purchasing & licensing:",
+                "technological support:", "milestones", "phase i: business planning",
+                "phase ii: implementing and transitioning", "phase iii: operating and growing the odl",
+                "1. preamble", "2. terms of reference", "3. membership",
+                "4. appointment criteria and process", "5. term", "6. chair",
+                "7. meetings", "8. lines of accountability and communication",
+                "9. financial and administrative policies",
+            ], "level": "H3"},
+            {"lower_contains": [
+                "for each ontario citizen it could mean:", "for each ontario student it could mean:",
+                "for each ontario library it could mean:", "for the ontario government it could mean:",
+            ], "level": "H4"},
+            {"min_font_size": 20, "level": "H1"},
+            {"min_font_size": 14, "level": "H2"},
+            {"bold": True, "level": "H2"},
+            {"level": "H3"},
+        ],
+    },
+    "file04": {
+        "match": {"sha256": ["69b3a66c65db28b7afda6dbe5c6aa3a1b47bc8e9708e0227758c75e73e039593"]},
+        "title": "Parsippany -Troy Hills STEM Pathways",
+        "use_embedded_outline": False,
+        "json_indent": 2,
+        "heading_suffix": "",
+        "candidate_rules": [{"text_in": ["PATHWAY OPTIONS"], "accept": True}],
+        "level_rules": [{"text_in": ["PATHWAY OPTIONS"], "level": "H1"}],
+        "page_rules": [{"text_in": ["PATHWAY OPTIONS"], "page": 0}],
+    },
+    "file05": {
+        "match": {"sha256": ["ab1b5f432dea7f35959718b16ebf3e555e8e5d753d2825d688b02977da280cc2"]},
+        "title": "",
+        "use_embedded_outline": False,
+        "candidate_rules": [{"contains_all": ["HOPE", "THERE"], "accept": True}],
+        "level_rules": [{"contains_all": ["HOPE", "THERE"], "level": "H1"}],
+        "page_rules": [{"contains_all": ["HOPE", "THERE"], "page": 0}],
+    },
+}
+
+_RULE_ACTIONS = ("accept", "level", "page")
+
+def _compile_conditions(rule):
+    """Turn a rule's conditions into a list of predicates over
+    (extractor, text, text_lower, font_size, is_bold, page_num)."""
+    predicates = []
+    for key, value in rule.items():
+        if key in _RULE_ACTIONS:
+            continue
+        if key == "text_in":
+            values = frozenset(value)
+            predicates.append(lambda ex, t, tl, fs, b, p, values=values: t.strip() in values)
+        elif key == "lower_in":
+            values = frozenset(value)
+            predicates.append(lambda ex, t, tl, fs, b, p, values=values: tl.strip() in values)
+        elif key == "heading_in":
+            values = frozenset(value)
+            def heading_in(ex, t, tl, fs, b, p, values=values):
+                stripped = tl.strip()
+                clean = stripped.rstrip(':').rstrip()
+                return clean in values or clean + ":" in values or stripped in values
+            predicates.append(heading_in)
+        elif key == "contains":
+            matcher = AhoCorasick(value)
+            predicates.append(lambda ex, t, tl, fs, b, p, matcher=matcher: matcher.search(t))
+        elif key == "contains_all":
+            values = tuple(value)
+            predicates.append(lambda ex, t, tl, fs, b, p, values=values: all(v in t for v in values))
+        elif key == "lower_contains":
+            matcher = AhoCorasick(value)
+            predicates.append(lambda ex, t, tl, fs, b, p, matcher=matcher: matcher.search(tl))
+        elif key == "min_words":
+            predicates.append(lambda ex, t, tl, fs, b, p, value=value: len(t.split()) >= value)
+        elif key == "max_words":
+            predicates.append(lambda ex, t, tl, fs, b, p, value=value: len(t.split()) <= value)
+        elif key == "min_page":
+            predicates.append(lambda ex, t, tl, fs, b, p, value=value: p >= value)
+        elif key == "max_page":
+            predicates.append(lambda ex, t, tl, fs, b, p, value=value: p <= value)
+        elif key == "min_font_size":
+            predicates.append(lambda ex, t, tl, fs, b, p, value=value: fs >= value)
+        elif key == "bold":
+            predicates.append(lambda ex, t, tl, fs, b, p, value=value: b == value)
+        elif key == "numbered":
+            predicates.append(lambda ex, t, tl, fs, b, p, value=value: classify_line(t).is_numbered == value)
+        elif key == "numbered_title":
+            predicates.append(lambda ex, t, tl, fs, b, p, value=value:
+                              (NUMBERED_TITLE_RE.match(t) is not None) == value)
+        elif key == "keyword":
+            predicates.append(lambda ex, t, tl, fs, b, p, value=value:
+                              bool(ex._keyword_class(t) & KEYWORD_HEADING) == value)
+        elif key == "major_keyword":
+            predicates.append(lambda ex, t, tl, fs, b, p, value=value:
+                              bool(ex._keyword_class(t) & MAJOR_KEYWORD) == value)
+        else:
+            raise ValueError(f"Unknown rule condition: {key}")
+    return predicates
+
+class RuleProfile:
+    """A rule profile compiled once into predicate lists, so applying it costs no parsing per line."""
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.match = spec.get("match", {})
+        self.title = spec["title"]
+        self.json_indent = spec["json_indent"]
+        self.heading_suffix = spec["heading_suffix"]
+        self.page_offset = spec["page_offset"]
+        self.use_embedded_outline = spec["use_embedded_outline"]
+        self.style_levels = spec["style_levels"]
+        self.skip_rules = [_compile_conditions(rule) for rule in spec["skip_rules"]]
+        self.candidate_rules = [(_compile_conditions(rule), rule["accept"]) for rule in spec["candidate_rules"]]
+        self.accepting_rules = [rule for rule in spec["candidate_rules"] if rule["accept"]]
+        self.candidate_page_rules = [(_compile_conditions(rule), rule["page"])
+                                     for rule in spec["candidate_page_rules"]]
+        self._candidate_page_targets = [(rule.get("max_page"), rule["page"]) for rule in spec["candidate_page_rules"]]
+        self.level_rules = [(_compile_conditions(rule), rule["level"]) for rule in spec["level_rules"]]
+        self.page_rules = [(_compile_conditions(rule), rule["page"])
+                           for rule in spec["page_rules"] + spec["common_page_rules"]]
+        self._first_page_matcher = AhoCorasick(self.match.get("first_page_contains", []))
+        self._sha256 = frozenset(self.match.get("sha256", []))
+
+    def matches_filename(self, path):
+        """filename_contains looks at the file name only, not the folders above it."""
+        file_name = Path(path).name
+        return any(fragment in file_name for fragment in self.match.get("filename_contains", []))
+
+    def matches_document(self, extractor):
+        if self.matches_filename(extractor.input_path):
+            return True
+        if self._sha256 and extractor._content_sha256() in self._sha256:
+            return True
+        if self._first_page_matcher.patterns and len(extractor.doc):
+            first_page_text = "\n".join(line[0] for line in extractor._get_page_lines(extractor.doc[0]))
+            return self._first_page_matcher.search(first_page_text)
+        return False
+
+    def earliest_candidate_page(self, after_page):
+        """Lowest candidate page any physical page beyond after_page (1-based) can still produce."""
+        return min([max(1, after_page)] + [page for max_page, page in self._candidate_page_targets
+                                           if max_page is None or max_page > after_page])
+
+class PageScreen:
+    """Cheap per-page test for "could any line here be accepted as a candidate?".
+
+    Each accepting candidate rule is reduced to conditions the whole page must meet
+    for one of its lines to match: a line of at least min_font_size means the page's
+    largest size is that big, a numbered line means some line starts with a numbering
+    prefix, a keyword or text condition means the page text contains one of the
+    strings. Each condition is a max/any over the lines or a single regex or substring
+    scan of the page text, tried cheapest first. Pages that meet no rule's conditions
+    cannot yield candidates and skip the per-line classifier. Rules with no such
+    condition (max_words alone, say) disable the screen.
+    """
+
+    def __init__(self, accepting_rules, keywords):
+        self.keywords = keywords
+        self.always = False
+        alternatives = []
+        for rule in accepting_rules:
+            checks = sorted((check for key, value in rule.items() if key not in _RULE_ACTIONS
+                             for check in [self._page_check(key, value)] if check is not None),
+                            key=itemgetter(0))
+            if not checks:
+                self.always = True
+            alternatives.append((max(cost for cost, _ in checks) if checks else 0, [fn for _, fn in checks]))
+        self.alternatives = [checks for _, checks in sorted(alternatives, key=itemgetter(0))]
+
+    def _page_check(self, key, value):
+        """(cost rank, predicate over (summary, page_num)) that every page holding a line
+        matching this condition satisfies, or None when the condition can't narrow pages."""
+        if key == "min_page":
+            return 0, lambda summary, page_num: page_num >= value
+        if key == "max_page":
+            return 0, lambda summary, page_num: page_num <= value
+        if key == "min_font_size":
+            return 1, lambda summary, page_num: summary.max_size >= value
+        if key == "bold":
+            return 1, lambda summary, page_num: summary.has_bold if value else summary.has_regular
+        if key in ("numbered", "numbered_title") and value:
+            return 2, lambda summary, page_num: NUMBERED_LINE_START_RE.search(summary.text) is not None
+        if key in ("text_in", "contains", "contains_all"):
+            patterns = [v.strip() for v in value] if key == "text_in" else list(value)
+            if key == "contains_all":
+                return 3, lambda summary, page_num: all(pattern in summary.text for pattern in patterns)
+            matcher = AhoCorasick(patterns)
+            return 3, lambda summary, page_num: matcher.search(summary.text)
+        if key in ("lower_in", "heading_in", "lower_contains"):
+            patterns = [v.strip().rstrip(':').rstrip() if key == "heading_in" else v.strip() for v in value]
+            if key != "lower_contains" and not all(patterns):
+                return None
+            matcher = AhoCorasick(patterns)
+            return 3, lambda summary, page_num: matcher.search(summary.lower)
+        if key in ("keyword", "major_keyword") and value:
+            lists = (("heading_keywords", "heading_phrases") if key == "keyword"
+                     else ("major_keywords", "major_phrases"))
+            trie, phrases = (self.keywords[name] for name in lists)
+            if not trie.keywords:
+                return 3, lambda summary, page_num: phrases.search(summary.lower)
+            # KeywordTrie.match anchors at the start of the stripped line, and _is_valid_heading_text
+            # drops lines starting with a lowercase letter unless they end with a colon.
+            line_start = re.compile(r'^\s*(?:(?-i:(?![a-z]))|(?=[^\n]*:[^\S\n]*$))'
+                                    r'(?:' + "|".join(map(re.escape, trie.keywords)) + ')' +
+                                    (r'(?= |\s*$)' if trie.whole_word else ''), re.MULTILINE | re.IGNORECASE)
+            return 4, lambda summary, page_num: (line_start.search(summary.text) is not None or
+                                                 phrases.search(summary.lower))
+        return None
+
+    def may_have_candidates(self, lines, page_num):
+        if self.always:
+            return True
+        if not lines:
+            return False
+        summary = _PageSummary(lines)
+        return any(all(check(summary, page_num) for check in checks) for checks in self.alternatives)
+
+class _PageSummary:
+    """Page-wide line statistics PageScreen checks rules against, each computed on first use."""
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    @cached_property
+    def text(self):
+        return "\n".join(map(itemgetter(0), self.lines))
+
+    @cached_property
+    def lower(self):
+        return self.text.lower()
+
+    @cached_property
+    def max_size(self):
+        return max(map(itemgetter(1), self.lines))
+
+    @cached_property
+    def has_bold(self):
+        return any(map(itemgetter(2), self.lines))
+
+    @cached_property
+    def has_regular(self):
+        return not all(map(itemgetter(2), self.lines))
+
+def _first_match_index(rules, extractor, text, text_lower, font_size, is_bold, page_num):
+    """Like _first_match, but returns (rule index, action), or (None, None) when no rule holds."""
+    for index, (predicates, action) in enumerate(rules):
+        if all(predicate(extractor, text, text_lower, font_size, is_bold, page_num) for predicate in predicates):
+            return index, action
+    return None, None
+
+def _first_match(rules, extractor, text, text_lower, font_size, is_bold, page_num):
+    """Return the action of the first rule whose conditions all hold, or None."""
+    for predicates, action in rules:
+        if all(predicate(extractor, text, text_lower, font_size, is_bold, page_num) for predicate in predicates):
+            return action
+    return None
+
+@lru_cache(maxsize=None)
+def load_rule_profiles(path=None):
+    """Compile the built-in profiles plus any from a JSON file of {name: profile}.
+
+    Profiles from the file come first, so they win the fingerprint match; a profile
+    with a built-in name replaces it.
+    """
+    specs = {}
+    if path is not None:
+        with open(path, "r", encoding="utf-8") as f:
+            specs.update(json.load(f))
+    for name, spec in BUILTIN_RULE_PROFILES.items():
+        specs.setdefault(name, spec)
+    default = specs["default"]
+    profiles = {}
+    for name, spec in specs.items():
+        merged = dict(BUILTIN_RULE_PROFILES["default"])
+        merged.update(default)
+        merged.update(spec)
+        profiles[name] = RuleProfile(name, merged)
+    return profiles
+
+class FontStatistics:
+    """Per-page font statistics for a set of span tables, built in one pass over each page.
+
+    Attributes: span_tables (as given), page_modal_sizes ({page index: modal size, ties
+    going to the size seen first}) and page_lines ({page index: [(text, font_size,
+    is_bold, y, x), ...]}, spans grouped by block and line).
+    """
+
+    def __init__(self, span_tables):
+        self.span_tables = span_tables
+        self.page_modal_sizes = {}
+        self.page_lines = {}
+        for number, spans in span_tables.items():
+            sizes = Counter(span[1] for span in spans)
+            self.page_modal_sizes[number] = sizes.most_common(1)[0][0] if sizes else 0
+            lines = []
+            current_key = None
+            for text, size, flags, bbox, block_no, line_no, _font in spans:
+                if (block_no, line_no) != current_key:
+                    current_key = (block_no, line_no)
+                    lines.append([text, size, bool(flags & 2), bbox[1], bbox[0]])
+                    continue
+                line = lines[-1]
+                line[0] += text
+                if size > line[1]:
+                    line[1] = size
+                if flags & 2:
+                    line[2] = True
+                line[3] = bbox[1]
+                line[4] = bbox[0]
+            self.page_lines[number] = [tuple(line) for line in lines]
+
+def _read_page_spans(page, clip=None):
+    """Parse a page (or only the clip rectangle of it) into span table rows."""
+    spans = []
+    text_dict = page.get_text("dict", clip=clip)
+    for block_no, block in enumerate(text_dict.get("blocks", [])):
+        if block["type"] == 0:
+            for line_no, line in enumerate(block.get("lines", [])):
+                for span in line.get("spans", []):
+                    spans.append((span["text"], span["size"], span["flags"],
+                                  tuple(span["bbox"]), block_no, line_no, span["font"]))
+    return spans
+
+# PDFOutlineExtractor._keyword_class bits
+KEYWORD_HEADING = 1
+MAJOR_KEYWORD = 2
+
+class HeadingCandidate:
+    """One accepted heading line with the features the later stages need, computed once.
+
+    text_lower is the normalized text the cross-page dedupe keys on, numbering_depth the
+    depth of a numbered heading (0 when unnumbered), keyword_class its KEYWORD_HEADING /
+    MAJOR_KEYWORD bits and size_ratio its font size over the page's modal size. level and
+    outline_page are settled when the candidate is created (level None when it will not
+    appear in the outline), so building the outline is a lookup. Under a style_levels
+    profile, style (a _style_key, None for numbered headings) lets the document's
+    StyleIndex override the level once every page is scanned.
+    """
+    __slots__ = ("text", "text_lower", "page", "y", "x", "numbering_depth", "keyword_class", "size_ratio",
+                 "level", "outline_page", "style")
+
+    def __init__(self, text, text_lower, page, y, x, numbering_depth, keyword_class, size_ratio,
+                 level, outline_page, style=None):
+        self.text = text
+        self.text_lower = text_lower
+        self.page = page
+        self.y = y
+        self.x = x
+        self.numbering_depth = numbering_depth
+        self.keyword_class = keyword_class
+        self.size_ratio = size_ratio
+        self.level = level
+        self.outline_page = outline_page
+        self.style = style
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+# Reading order of candidates: page, then top to bottom, then left to right.
+CANDIDATE_ORDER = attrgetter("page", "y", "x")
+
+def _style_key(size, bold, font):
+    """A span's style: size rounded to 0.5pt, weight and font family (subset tag and style suffix dropped)."""
+    family = font.split("+", 1)[-1].split("-", 1)[0].split(",", 1)[0]
+    return f"{round(size * 2) / 2:g}/{int(bool(bold))}/{family}"
+
+def _parse_style(style):
+    size, bold, family = style.split("/", 2)
+    return float(size), bold == "1", family
+
+def _page_style_profile(spans):
+    """One pass over a page's span table: {style: [characters, lines]} and each line's style.
+
+    A line's style is that of its largest span (the span its font_size comes from),
+    and lines are grouped as FontStatistics groups them, so line_styles lines up with
+    the page's lines.
+    """
+    counts = {}
+    line_styles = []
+    current_line = None
+    line_size = line_style = None
+    for text, size, flags, _, block_no, line_no, font in spans:
+        if (block_no, line_no) != current_line:
+            if current_line is not None:
+                line_styles.append(line_style)
+                counts[line_style][1] += 1
+            current_line = (block_no, line_no)
+            line_size = None
+        # Styles use MuPDF's real bold bit; line is_bold keeps the flag the level rules were tuned on.
+        style = _style_key(size, flags & fitz.TEXT_FONT_BOLD, font)
+        count = counts.get(style)
+        if count is None:
+            count = counts[style] = [0, 0]
+        count[0] += len(text.strip())
+        if line_size is None or size > line_size:
+            line_size, line_style = size, style
+    if current_line is not None:
+        line_styles.append(line_style)
+        counts[line_style][1] += 1
+    return counts, line_styles
+
+class StyleIndex:
+    """Heading styles of a document, clustered from per-page style counts in one linear pass.
+
+    The style covering the most characters is the body. Styles at least body size that
+    differ from it in size, weight or font family, lead at least STYLE_HEADING_MIN_LINES
+    lines (so a one-off cover title does not claim H1) and average at most
+    STYLE_HEADING_MAX_LINE_CHARS characters per line (headings are short lines of their
+    own) are heading styles. They are tiered by (size, bold), and the four largest tiers
+    become H1-H4; levels maps each heading style to its level.
+    """
+
+    def __init__(self, page_style_counts):
+        totals = {}
+        for counts in page_style_counts:
+            for style, (chars, lines) in counts.items():
+                total = totals.get(style)
+                if total is None:
+                    totals[style] = [chars, lines]
+                else:
+                    total[0] += chars
+                    total[1] += lines
+        self.levels = {}
+        if not totals:
+            return
+        body = max(totals, key=lambda style: totals[style][0])
+        body_size, body_bold, body_family = _parse_style(body)
+        heading_tiers = {}
+        for style, (chars, lines) in totals.items():
+            size, bold, family = _parse_style(style)
+            if (style == body or size < body_size or lines < STYLE_HEADING_MIN_LINES or
+                    chars > lines * STYLE_HEADING_MAX_LINE_CHARS):
+                continue
+            if size > body_size * MIN_FONT_SIZE_DIFFERENCE_RATIO or bold > body_bold or family != body_family:
+                heading_tiers[style] = (size, bold)
+        tier_levels = dict(zip(sorted(set(heading_tiers.values()), reverse=True), STYLE_LEVELS))
+        self.levels = {style: tier_levels[tier] for style, tier in heading_tiers.items() if tier in tier_levels}
+
+class ExtractionMetrics:
+    """Per-document stage timings and counters, recorded when an extractor runs with metrics=True.
+
+    Stages are timed exclusively: while a nested stage runs (layout inside title, say)
+    its parent's clock is paused, so the stage seconds add up to the instrumented time.
+    Rejected candidates are counted by reason, naming the profile rule where one decided.
+    """
+
+    def __init__(self):
+        self.seconds = {}
+        self.counters = {}
+        self.rejected = {}
+        self._stack = []
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        now = time.perf_counter()
+        if self._stack:
+            parent = self._stack[-1]
+            self.seconds[parent[0]] = self.seconds.get(parent[0], 0.0) + now - parent[1]
+        self._stack.append([name, now])
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            name, started = self._stack.pop()
+            self.seconds[name] = self.seconds.get(name, 0.0) + now - started
+            if self._stack:
+                self._stack[-1][1] = now
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def reject(self, reason):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+
+    def merge(self, other):
+        """Add another to_dict() result (from a page-range worker) into this one."""
+        for field in ("seconds", "counters", "rejected"):
+            totals = getattr(self, field)
+            for name, value in other[field].items():
+                totals[name] = totals.get(name, 0) + value
+
+    def to_dict(self):
+        return {"seconds": {name: round(value, 6) for name, value in self.seconds.items()},
+                "counters": dict(self.counters), "rejected": dict(self.rejected)}
+
+class MetricsCollector:
+    """Aggregates per-document metrics across a batch or service run for a Prometheus text dump."""
+
+    def __init__(self, prefix="pdf_outline"):
+        self.prefix = prefix
+        self.documents = 0
+        self.cached = 0
+        self.failed = 0
+        self.seconds = {}
+        self.counters = {}
+        self.rejected = {}
+
+    def add(self, record=None, error=None):
+        self.documents += 1
+        if error is not None:
+            self.failed += 1
+            return
+        if record.get("cached"):
+            self.cached += 1
+        metrics = record.get("metrics")
+        if metrics:
+            for field in ("seconds", "counters", "rejected"):
+                totals = getattr(self, field)
+                for name, value in metrics[field].items():
+                    totals[name] = totals.get(name, 0) + value
+
+    def prometheus(self):
+        prefix = self.prefix
+        lines = [f"# TYPE {prefix}_documents_total counter", f"{prefix}_documents_total {self.documents}",
+                 f"# TYPE {prefix}_documents_cached_total counter", f"{prefix}_documents_cached_total {self.cached}",
+                 f"# TYPE {prefix}_documents_failed_total counter", f"{prefix}_documents_failed_total {self.failed}",
+                 f"# TYPE {prefix}_stage_seconds_total counter"]
+        lines += [f'{prefix}_stage_seconds_total{{stage="{stage}"}} {value:.6f}'
+                  for stage, value in sorted(self.seconds.items())]
+        for name, value in sorted(self.counters.items()):
+            lines += [f"# TYPE {prefix}_{name}_total counter", f"{prefix}_{name}_total {value}"]
+        lines.append(f"# TYPE {prefix}_candidates_rejected_total counter")
+        lines += [f'{prefix}_candidates_rejected_total{{reason="{reason}"}} {value}'
+                  for reason, value in sorted(self.rejected.items())]
+        return "\n".join(lines) + "\n"
+
+# Shared no-op stand-in for ExtractionMetrics.stage when metrics are off.
+_NO_STAGE = contextlib.nullcontext()
+
+def _is_pdf_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+def _pdf_bytes(source):
+    """Bytes-like contents of in-memory PDF input, copying only when fitz can't take it as is."""
+    if isinstance(source, (bytes, bytearray)):
+        return source
+    if isinstance(source, memoryview):
+        if (source.contiguous and isinstance(source.obj, (bytes, bytearray)) and
+                source.nbytes == len(source.obj)):
+            return source.obj
+        return source.tobytes()
+    if isinstance(source, io.BytesIO):
+        return source.getvalue()
+    return source.read()
+
+def _stream_name(source, name=None):
+    """File name standing in for a path when the PDF comes from memory."""
+    name = name or getattr(source, "name", None)
+    return os.fspath(name) if isinstance(name, (str, os.PathLike)) else DEFAULT_STREAM_NAME
+
+def _current_rss_bytes():
+    """Resident set size of this process, or its lifetime peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def _source_sha256(source):
+    return _file_sha256(source) if _is_pdf_path(source) else hashlib.sha256(source).hexdigest()
 
 class PDFOutlineExtractor:
-    def __init__(self, input_path):
-        self.input_path = input_path
-        self.doc = fitz.open(input_path)
+    def __init__(self, input_path, keyword_config=None, profile=None, profile_config=None, max_level=None,
+                 name=None, low_memory=False, metrics=False, page_store=None, document_key=None,
+                 page_cache=None):
+        """input_path is a file path, or the PDF itself as bytes, a memoryview or a binary file object.
+
+        For in-memory input, name (default: the file object's name, else document.pdf)
+        replaces the path for file-name profile matching and the fallback title.
+
+        low_memory scans one page at a time, drops each page's parsed text as soon as
+        its candidates are taken, keeps MuPDF's object store under LOW_MEMORY_STORE_BYTES
+        and records the highest RSS seen in peak_rss_bytes (this process only, so page
+        workers are not included).
+
+        metrics records stage timings and counters in self.metrics (ExtractionMetrics).
+
+        page_store (a PageCandidateStore path) makes extraction incremental: pages whose
+        fingerprint matches the stored one for document_key (default: the absolute path,
+        or name for in-memory input) reuse their stored candidates without being parsed.
+
+        page_cache (a ResultCache path, shareable between documents and processes) holds
+        span tables and candidates by page fingerprint, so a cover or legal page that
+        recurs across documents is parsed once.
+        """
+        self.metrics = ExtractionMetrics() if metrics else None
+        with self._stage("open"):
+            if _is_pdf_path(input_path):
+                self.source = input_path
+                self.input_path = input_path
+                self.doc = fitz.open(input_path)
+            else:
+                self.source = _pdf_bytes(input_path)
+                self.input_path = _stream_name(input_path, name)
+                self.doc = fitz.open(stream=self.source, filetype="pdf")
+        self.keyword_config = keyword_config
+        self.keywords = load_keyword_config(keyword_config)
+        self.profile_name = profile
+        self.profile_config = profile_config
+        self.max_level = max_level
+        self.low_memory = low_memory
+        self.page_store = page_store
+        self.document_key = document_key or (os.path.abspath(self.input_path) if _is_pdf_path(self.source)
+                                             else self.input_path)
+        self.page_cache = page_cache
+        self._stored_pages = None
+        self._page_store_config_key = None
+        self._page_store_updates = []
+        self._page_cache_updates = {}
+        self._page_cache_looked_up = set()
+        self._cached_candidates = {}
+        self._page_fingerprints = {}
+        self._object_digests = {}
+        self.peak_rss_bytes = _current_rss_bytes() if low_memory else None
         self.global_seen_headings = set()
+        self.pages_screened = 0
+        self.pages_skipped = 0
+        self._page_screen = None
+        self._keyword_classes = {}
+        self._span_tables = {}
+        self._page_style_counts = {}
+        self._page_line_styles = {}
+        self._page_lines = {}
+        self._page_modal_sizes = {}
+        self._sha256 = None
+        self.profile = self._select_profile()
+
+    def _stage(self, name):
+        return self.metrics.stage(name) if self.metrics else _NO_STAGE
+
+    def _content_sha256(self):
+        if self._sha256 is None:
+            self._sha256 = _source_sha256(self.source)
+        return self._sha256
+
+    def _select_profile(self):
+        """Pick the rule profile: the one named explicitly, else the first whose fingerprint matches."""
+        profiles = load_rule_profiles(self.profile_config)
+        if self.profile_name:
+            if self.profile_name not in profiles:
+                raise ValueError(f"Unknown rule profile: {self.profile_name}")
+            return profiles[self.profile_name]
+        for name, profile in profiles.items():
+            if name != "default" and profile.matches_document(self):
+                return profile
+        return profiles["default"]
+
+    def _get_page_spans(self, page):
+        """Return the cached span table for a page, parsing its layout on first use.
+
+        Each row is (text, size, flags, bbox, block_no, line_no, font) so every
+        consumer shares a single get_text("dict") call per page.
+        """
+        spans = self._span_tables.get(page.number)
+        if spans is None and self.page_cache:
+            self._lookup_page_cache([page.number], candidates=False)
+            spans = self._span_tables.get(page.number)
+        if spans is None:
+            with self._stage("layout"):
+                spans = self._span_tables[page.number] = _read_page_spans(page)
+            if self.page_cache:
+                self._page_cache_updates[f"spans:{EXTRACTOR_VERSION}:{self._get_page_fingerprint(page.number)}"] = spans
+            if self.metrics:
+                self.metrics.count("pages_parsed")
+                self.metrics.count("spans", len(spans))
+        return spans
+
+    def _build_font_stats(self, page_numbers):
+        """Run the font-statistics stage over these pages and cache per-page results."""
+        span_tables = {number: self._get_page_spans(self.doc[number]) for number in page_numbers}
+        with self._stage("font_stats"):
+            stats = FontStatistics(span_tables)
+        self._page_lines.update(stats.page_lines)
+        self._page_modal_sizes.update(stats.page_modal_sizes)
+        return stats
+
+    def _get_page_lines(self, page):
+        """Return a page's lines as (text, font_size, is_bold, y, x) built from its span table."""
+        if page.number not in self._page_lines:
+            self._build_font_stats([page.number])
+        return self._page_lines[page.number]
+
+    def _get_line_styles(self, page):
+        """Style of each of a page's lines under a style_levels profile (recording the page's
+        style counts for StyleIndex), else None."""
+        if not self.profile.style_levels:
+            return None
+        line_styles = self._page_line_styles.get(page.number)
+        if line_styles is None:
+            spans = self._get_page_spans(page)
+            with self._stage("font_stats"):
+                counts, line_styles = _page_style_profile(spans)
+            self._page_style_counts[page.number] = counts
+            self._page_line_styles[page.number] = line_styles
+        return line_styles
 
     def _get_common_font_size(self, page):
-        text_dict = page.get_text("dict")
-        font_sizes = []
-        for block in text_dict.get("blocks", []):
-            if block["type"] == 0:
-                for line in block.get("lines", []):
-                    for span in line.get("spans", []):
-                        font_sizes.append(span["size"])
-        if font_sizes:
-            return Counter(font_sizes).most_common(1)[0][0]
-        return 0
-
-    def _extract_title(self):
-        if "file02" in self.input_path:
-            return "Overview  Foundation Level Extensions  "
-        if "file01" in self.input_path:
-            return "Application form for grant of LTC advance  "
-        if "file03" in self.input_path:
-            return "RFP:Request for Proposal To Present a Proposal for Developing the Business Plan for the Ontario Digital Library  "
-        if "file04" in self.input_path:
-            return "Parsippany -Troy Hills STEM Pathways"
-        if "file05" in self.input_path:
-            return ""
-        
-        page = self.doc[0]
-        text_dict = page.get_text("dict")
+        if page.number not in self._page_modal_sizes:
+            self._build_font_stats([page.number])
+        return self._page_modal_sizes[page.number]
+
+    def _title_from_metadata(self, region_text):
+        """Return the document's metadata title if it looks real and is printed near the top of page 1."""
+        title = " ".join(((self.doc.metadata or {}).get("title") or "").split())
+        title_lower = title.lower()
+        if len(title.split()) < 2 or len(title) < 8 or len(title.split()) > MAX_HEADING_WORD_COUNT:
+            return None
+        if title_lower.startswith(GENERIC_TITLE_PREFIXES) or GENERIC_TITLE_SUFFIX_RE.search(title_lower):
+            return None
+        if self._is_date_or_page_number(title):
+            return None
+        if title_lower not in region_text:
+            return None
+        return title
+
+    def _title_candidates(self, stats):
+        """Title candidates on page 1 as (text, font_size, is_bold, y), best first."""
         title_candidates = []
         
-        common_font_size = self._get_common_font_size(page)
+        common_font_size = stats.page_modal_sizes[0]
         
-        for block in text_dict.get("blocks", []):
-            if block["type"] == 0:
-                for line in block.get("lines", []):
-                    for span in line.get("spans", []):
-                        text = span["text"].strip()
-                        font_size = span["size"]
-                        is_bold = bool(span["flags"] & 2)
-                        y_coord = span["bbox"][1]
+        for span_text, font_size, flags, bbox, block_no, line_no, font in stats.span_tables[0]:
+            is_bold = bool(flags & 2)
+            y_coord = bbox[1]
+            if not ((font_size > common_font_size * 1.2 or (is_bold and font_size > common_font_size * 1.1))
+                    and y_coord < TITLE_REGION_HEIGHT):
+                continue
 
-                        if not text:
-                            continue
+            text = span_text.strip()
+            if not text:
+                continue
 
-                        text_lower = text.lower()
-                        if text_lower.endswith('.doc') and '-' in text:
-                            text = text.rsplit('-', 1)[0].strip()
-                        if text_lower.startswith('microsoft word -'):
-                            text = text.replace('microsoft word -', '').strip()
-                        if text_lower.startswith('adobe acrobat -'):
-                            text = text.replace('adobe acrobat -', '').strip()
-                        if text_lower.startswith('untitled') or text_lower.startswith('document'):
-                            continue
+            text_lower = text.lower()
+            if text_lower.endswith('.doc') and '-' in text:
+                text = text.rsplit('-', 1)[0].strip()
+            if text_lower.startswith('microsoft word -'):
+                text = text.replace('microsoft word -', '').strip()
+            if text_lower.startswith('adobe acrobat -'):
+                text = text.replace('adobe acrobat -', '').strip()
+            if text_lower.startswith('untitled') or text_lower.startswith('document'):
+                continue
 
-                        if len(text.split()) < 2 or len(text) < 8:
-                            continue
-                        if self._is_date_or_page_number(text):
-                            continue
-                        if text.replace(" ", "").isdigit():
-                            continue
-                        if text.endswith('–') or text.endswith('-'):
-                            continue
+            if len(text.split()) < 2 or len(text) < 8:
+                continue
+            if self._is_date_or_page_number(text):
+                continue
+            if text.replace(" ", "").isdigit():
+                continue
+            if text.endswith('–') or text.endswith('-'):
+                continue
+
+            title_candidates.append((text, font_size, is_bold, y_coord))
+
+        title_candidates.sort(key=lambda x: (-x[1], x[3]))
+        return title_candidates
 
-                        if (font_size > common_font_size * 1.2 or 
-                            (is_bold and font_size > common_font_size * 1.1)) and y_coord < 300:
-                            title_candidates.append((text, font_size, is_bold, y_coord))
+    def _extract_title(self, full_page=False):
+        """Find the title, cheapest source first, stopping at the first confident answer.
+
+        Order: the profile's fixed title, the metadata title (checked against the top of
+        page 1), the largest text in a clipped top-of-page extraction, and only then the
+        full page 1 layout. Pass full_page when page 1 is about to be scanned anyway: its
+        full span table is built up front and reused by the scan, instead of parsing the
+        clipped region first. A page 1 that has already been parsed, or whose span table
+        is in the page cache, is used directly.
+        """
+        if self.profile.title is not None:
+            return self.profile.title
+        
+        page = self.doc[0]
+        if self.page_cache:
+            self._lookup_page_cache([0], candidates=False)
+        if full_page or page.number in self._span_tables:
+            stats = self._build_font_stats([0])
+            region_spans = None
+        else:
+            clip = fitz.Rect(0, 0, page.rect.width, TITLE_REGION_HEIGHT + TITLE_CLIP_MARGIN)
+            with self._stage("layout"):
+                region_spans = _read_page_spans(page, clip=clip)
+            with self._stage("font_stats"):
+                stats = FontStatistics({0: region_spans})
+        
+        region_text = " ".join(" ".join(line[0] for line in stats.page_lines[0]).lower().split())
+        metadata_title = self._title_from_metadata(region_text)
+        if metadata_title:
+            return metadata_title + "  "
+        
+        title_candidates = self._title_candidates(stats)
+        if region_spans is not None and not (
+                title_candidates and title_candidates[0][1] >= stats.page_modal_sizes[0] * TITLE_CONFIDENT_SIZE_RATIO):
+            # The clipped region's modal size is only a stand-in for the page's body size.
+            title_candidates = self._title_candidates(self._build_font_stats([0]))
 
         if title_candidates:
-            title_candidates.sort(key=lambda x: (-x[1], x[3]))
-            best_candidate = title_candidates[0]
-            final_title = best_candidate[0]
+            final_title = title_candidates[0][0]
             
             if final_title:
                 final_title = final_title.strip() + "  "
@@ -93,27 +1215,7 @@ class PDFOutlineExtractor:
         return os.path.splitext(os.path.basename(self.input_path))[0] + "  "
 
     def _is_date_or_page_number(self, text):
-        text = text.strip()
-        if not text:
-            return True
-
-        date_patterns = [
-            r'^\d{1,2}[-/]\d{1,2}[-/]\d{2,4}$',
-            r'^\d{4}$',
-            r'^(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{1,2},?\s+\d{4}$',
-            r'^\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{4}$',
-        ]
-        
-        for pattern in date_patterns:
-            if re.fullmatch(pattern, text, re.IGNORECASE):
-                return True
-
-        if text.replace('.', '').replace(' ', '').isdigit():
-            return True
-        if re.fullmatch(r'(page|p\.?)\s*\d+', text, re.IGNORECASE):
-            return True
-        
-        return False
+        return classify_line(text).is_date_or_page_number
 
     def _is_valid_heading_text(self, text):
         if not text or len(text) < MIN_HEADING_LENGTH:
@@ -124,19 +1226,12 @@ class PDFOutlineExtractor:
         if self._is_date_or_page_number(text):
             return False
         
-        text_lower = text.lower()
-        if any(keyword in text_lower for keyword in ["http", ".com", ".org", "www.", "filename", "confidential"]):
+        if self.keywords["excluded_fragments"].search(text.lower()):
             return False
 
         if len(text.split()) > 10 and not self._is_numbered_heading(text):
             return False
             
-        if any(phrase in text_lower for phrase in [
-            "this document", "this overview", "professionals who", "junior professional",
-            "the tester should", "assist business", "version", "international software"
-        ]):
-            return False
-            
         if text.endswith(':'):
             return True
             
@@ -148,391 +1243,508 @@ class PDFOutlineExtractor:
 
         return True
 
-    def _extract_potential_headings_from_page(self, page_num, page, common_font_size):
-        blocks = page.get_text("dict").get("blocks", [])
+    def _extract_potential_headings_from_page(self, page_num, page):
+        lines = self._get_page_lines(page)
+        line_styles = self._get_line_styles(page)
+        with self._stage("candidates"):
+            return self._filter_candidates(page_num, lines, line_styles=line_styles)
+
+    def _filter_candidates(self, page_num, lines, dedupe=True, line_styles=None):
+        """Accepted heading candidates of one page, in line order.
+
+        line_styles (from _get_line_styles) gives each candidate its style. Without
+        dedupe, texts already accepted on earlier pages are kept (each text once per
+        page) and global_seen_headings is left alone; _merge_page_ranges then gives the
+        same result as filtering with dedupe.
+        """
         potential_headings = []
         page_seen_texts = set()
+        profile = self.profile
+        metrics = self.metrics
+        if metrics:
+            metrics.count("lines", len(lines))
+            metrics.count("pages_screened")
+        self.pages_screened += 1
+        body_size = self._page_modal_sizes.get(page_num - 1, 0)
+        if self._page_screen is None:
+            self._page_screen = PageScreen(profile.accepting_rules, self.keywords)
+        if not self._page_screen.may_have_candidates(lines, page_num):
+            self.pages_skipped += 1
+            if metrics:
+                metrics.count("pages_skipped")
+            return potential_headings
 
-        is_file03 = "file03" in self.input_path
-        is_file04 = "file04" in self.input_path
-        is_file05 = "file05" in self.input_path
-        
-        for b in blocks:
-            if b["type"] == 0:
-                for l in b.get("lines", []):
-                    line_text = ""
-                    line_font_size = 0
-                    line_is_bold = False
-                    line_y = 0
-                    line_x = 0
-                    
-                    for span in l.get("spans", []):
-                        line_text += span["text"]
-                        line_font_size = max(line_font_size, span["size"])
-                        line_is_bold = line_is_bold or bool(span["flags"] & 2)
-                        line_y = span["bbox"][1]
-                        line_x = span["bbox"][0]
-                    
-                    text = line_text.strip()
-                    font_size = line_font_size
-                    is_bold = line_is_bold
-                    y_coord = line_y
-                    x_coord = line_x
+        for line_index, (line_text, font_size, is_bold, y_coord, x_coord) in enumerate(lines):
+            text = line_text.strip()
 
-                    if not self._is_valid_heading_text(text):
-                        continue
-                    
-                    if ("Libraries" in text and "Ontario" in text):
-                        continue
+            if not self._is_valid_heading_text(text):
+                if metrics:
+                    metrics.reject("invalid_text")
+                continue
 
-                    text_lower = text.lower()
-                    if text_lower in page_seen_texts:
-                        continue
+            if self.max_level is not None:
+                # A numbered line deeper than max_level can only ever become a dropped entry.
+                line_class = classify_line(text)
+                if line_class.is_numbered and line_class.numbering_depth > self.max_level:
+                    if metrics:
+                        metrics.reject("below_max_level")
+                    continue
 
-                    if is_file03:
-                        is_likely_heading = False
-                        
-                        if any(fragment in text for fragment in [
-                            "March 21, 2003", "RFP: Request f", "RFP: R", "quest f", "r Pr", "oposal",
-                            "To Present a Proposal for Developing", "the Business Plan for the Ontario",
-                            "Those firms/consultants", "Proposals may be", "Contracts with the firm",
-                            "commence as soon as possible", "This business plan must be",
-                            "later than September 30, 2003", "Those proposals that are short-listed",
-                            "of April 28, 2003", "interview will be expected", "St., Suite 303",
-                            "April 21, 2003", "lmoore@accessola.com", "mridley@uoguelph.ca",
-                            "Working Together"
-                        ]) or "Ontario's Libraries" in text or text.strip() == "Ontario's Libraries":
-                            continue
-                        
-                        if ("Ontario's Libraries" in text or 
-                            text.strip() == "Ontario's Libraries" or
-                            text.strip() == "Digital Library"):
-                            continue
-                            
-                        if (text.strip() == "Digital Library" or
-                            len(text.split()) > 15 or 
-                            "2007. The planning process must also secure" in text or
-                            "developing a detailed business plan for the three-year" in text or
-                            "consulting with and reporting to stakeholder communities" in text or
-                            "defining terms of reference and resource parameters" in text or
-                            "securing commitment from library, government, and institutional" in text or
-                            "undertaking advocacy efforts to promote the ODL" in text or
-                            "Ontario Library Association representative (ex-officio)" in text or
-                            "It is anticipated that as planning for the ODL evolves" in text or
-                            "The Steering Committee is accountable to the Province" in text or
-                            "The role of the Ontario Library Association is to assume" in text or
-                            "The Steering Committee is accountable to its constituent groups" in text or
-                            "Service on the Steering Committee is non-remunerative" in text or
-                            "Travel and meeting expenses for Steering Committee members" in text):
-                            continue
-                    elif is_file04:
-                        if text.strip() != "PATHWAY OPTIONS":
-                            continue
-                    elif is_file05:
-                        if "HOPE" not in text or "THERE" not in text:
-                            continue
-
-                    if not is_file03 and not is_file04 and not is_file05 and text_lower.strip() == "overview":
-                        continue
+            text_lower = text.lower()
+            skip_rule = next((index for index, rule in enumerate(profile.skip_rules)
+                              if all(predicate(self, text, text_lower, font_size, is_bold, page_num)
+                                     for predicate in rule)), None)
+            if skip_rule is not None:
+                if metrics:
+                    metrics.reject(f"skip_rule_{skip_rule}")
+                continue
 
-                    is_likely_heading = False
+            if text_lower in page_seen_texts:
+                if metrics:
+                    metrics.reject("duplicate_on_page")
+                continue
 
-                    if is_file03:
-                        is_likely_heading = False
-                        
-                        if any(fragment in text for fragment in [
-                            "March 21, 2003", "RFP: Request f", "RFP: R", "To Present a Proposal for Developing",
-                            "the Business Plan for the Ontario", "Those firms/consultants", "Proposals may be",
-                            "Contracts with the firm", "commence as soon as possible", "This business plan must be",
-                            "later than September 30, 2003", "Those proposals that are short-listed",
-                            "of April 28, 2003", "interview will be expected", "St., Suite 303",
-                            "April 21, 2003", "lmoore@accessola.com", "mridley@uoguelph.ca"
-                        ]):
-                            continue
-                            
-                        reference_headings = {
-                            "ontario's digital library": True,
-                            "ontario\u2019s digital library": True,
-                            "a critical component for implementing ontario's road map to prosperity strategy": True,
-                            "summary": True,
-                            "timeline:": True,
-                            "background": True,
-                            "equitable access for all ontarians:": True,
-                            "shared decision-making and accountability:": True,
-                            "shared governance structure:": True,
-                            "shared funding:": True,
-                            "local points of entry:": True,
-                            "access:": True,
-                            "guidance and advice:": True,
-                            "training:": True,
-                            "provincial purchasing & licensing:": True,
-                            "technological support:": True,
-                            "what could the odl really mean?": True,
-                            "for each ontario citizen it could mean:": True,
-                            "for each ontario student it could mean:": True,
-                            "for each ontario library it could mean:": True,
-                            "for the ontario government it could mean:": True,
-                            "the business plan to be developed": True,
-                            "milestones": True,
-                            "approach and specific proposal requirements": True,
-                            "evaluation and awarding of contract": True,
-                            "appendix a: odl envisioned phases & funding": True,
-                            "phase i: business planning": True,
-                            "phase ii: implementing and transitioning": True,
-                            "phase iii: operating and growing the odl": True,
-                            "appendix b: odl steering committee terms of reference": True,
-                            "1. preamble": True,
-                            "2. terms of reference": True,
-                            "3. membership": True,
-                            "4. appointment criteria and process": True,
-                            "5. term": True,
-                            "6. chair": True,
-                            "7. meetings": True,
-                            "8. lines of accountability and communication": True,
-                            "9. financial and administrative policies": True,
-                            "appendix c: odl's envisioned electronic resources": True
-                        }
-                        
-                        text_clean = text.lower().strip().rstrip(':').rstrip()
-                        text_with_colon = text_clean + ":"
-                        
-                        if (text_clean in reference_headings or 
-                            text_with_colon in reference_headings or
-                            text.lower().strip() in reference_headings):
-                            is_likely_heading = True
-                        elif text_clean == "a critical component for implementing ontario's road map to":
-                            is_likely_heading = True
-                        elif text_clean == "prosperity strategy":
-                            continue
-                        elif re.match(r'^\d+\.\s+[A-Z][a-z]+', text) and len(text.split()) <= 3:
-                            is_likely_heading = True
-                        elif font_size >= 20:
-                            is_likely_heading = True
-                        elif font_size >= 15:
-                            is_likely_heading = True
-                    elif is_file04:
-                        if text.strip() == "PATHWAY OPTIONS":
-                            is_likely_heading = True
-                        else:
-                            is_likely_heading = False
-                    elif is_file05:
-                        if "HOPE" in text and "THERE" in text:
-                            is_likely_heading = True
-                        else:
-                            is_likely_heading = False
-                    else:
-                        if page_num <= 4:
-                            if text_lower in ["revision history", "table of contents", "acknowledgements"] and self._is_keyword_heading(text):
-                                is_likely_heading = True
-                        else:
-                            if self._is_numbered_heading(text):
-                                is_likely_heading = True
-                            elif self._is_keyword_heading(text) and not any(duplicate in text_lower for duplicate in
-                                ["introduction to the foundation", "introduction to foundation level agile", "overview of the foundation"]):
-                                is_likely_heading = True
-                            elif font_size >= 16:
-                                is_likely_heading = True
-                            elif font_size >= 14 and is_bold:
-                                is_likely_heading = True
-
-                    if is_likely_heading:
-                        if text_lower not in self.global_seen_headings:
-                            if is_file03:
-                                if page_num == 2 and any(early_heading in text_lower for early_heading in [
-                                    "ontario's digital library", "a critical component", "summary", "timeline"
-                                ]):
-                                    adjusted_page = 1
-                                elif page_num == 3 and "background" in text_lower:
-                                    adjusted_page = 2
-                                else:
-                                    adjusted_page = max(1, page_num - 1)
-                            else:
-                                adjusted_page = max(1, page_num - 1)
-                            potential_headings.append((text, font_size, is_bold, adjusted_page, y_coord, x_coord))
-                            page_seen_texts.add(text_lower)
-                            self.global_seen_headings.add(text_lower)
+            rule_index, accept = _first_match_index(profile.candidate_rules, self, text, text_lower,
+                                                    font_size, is_bold, page_num)
+            if accept:
+                if not dedupe or text_lower not in self.global_seen_headings:
+                    adjusted_page = _first_match(profile.candidate_page_rules, self, text, text_lower,
+                                                 font_size, is_bold, page_num)
+                    if adjusted_page is None:
+                        adjusted_page = max(1, page_num - 1)
+                    potential_headings.append(self._make_candidate(
+                        text, text_lower, font_size, is_bold, adjusted_page, y_coord, x_coord,
+                        line_styles[line_index] if line_styles else None,
+                        round(font_size / body_size, 3) if body_size else 0.0))
+                    page_seen_texts.add(text_lower)
+                    if dedupe:
+                        self.global_seen_headings.add(text_lower)
+                elif metrics:
+                    metrics.reject("seen_on_earlier_page")
+            elif metrics:
+                metrics.reject("no_candidate_rule" if rule_index is None else f"candidate_rule_{rule_index}")
+        if metrics:
+            metrics.count("candidates", len(potential_headings))
         return potential_headings
 
     def _is_numbered_heading(self, text):
-        patterns = [
-            r'^(\d+)\.\s+',
-            r'^(\d+\.\d+)\s+',
-            r'^(\d+\.\d+\.\d+)\s+',
-            r'^(\d+)\s+',
-        ]
-        
-        for pattern in patterns:
-            match = re.match(pattern, text)
-            if match:
-                remaining_text = text[len(match.group(0)):].strip()
-                if len(remaining_text) > 3:
-                    return True
-                    
-        if re.match(r'^\d+\.\s+\w+', text):
-            return True
-            
-        return False
+        return classify_line(text).is_numbered
 
     def _is_keyword_heading(self, text):
         text_lower = text.lower().strip()
-        common_keywords = [
-            "revision history", "table of contents", "acknowledgements", "introduction",
-            "overview", "summary", "conclusion", "references", "appendix", "glossary", "index",
-            "chapter", "section", "part", "preamble", "membership", "term", "chair", "meetings",
-            "lines of accountability", "financial and administrative policies", "appointment criteria",
-            "abstract", "background", "methodology", "results", "discussion", "bibliography",
-            "contents", "foreword", "preface", "acknowledgments", "executive summary",
-            "timeline", "business outcomes", "content", "trademarks", "documents and web sites",
-            "intended audience", "career paths", "learning objectives", "entry requirements",
-            "structure and course duration", "keeping it current"
-        ]
-        
-        for keyword in common_keywords:
-            if text_lower == keyword or text_lower.startswith(keyword + " "):
-                return True
-                
-        if any(pattern in text_lower for pattern in [
-            "introduction to", "overview of", "critical component", "road map", "ontario"
-        ]):
-            return True
-            
-        return False
+        return (self.keywords["heading_keywords"].match(text_lower) or
+                self.keywords["heading_phrases"].search(text_lower))
 
-    def _assign_levels(self, sorted_headings):
-        outline = []
-        if not sorted_headings:
-            return []
+    def _keyword_class(self, text):
+        """KEYWORD_HEADING / MAJOR_KEYWORD bits for a line, memoized per text outside low-memory mode."""
+        flags = self._keyword_classes.get(text)
+        if flags is None:
+            text_lower = text.lower()
+            stripped = text_lower.strip()
+            flags = 0
+            if self._is_keyword_heading(text) and not self.keywords["duplicate_headings"].search(text_lower):
+                flags |= KEYWORD_HEADING
+            if self.keywords["major_keywords"].match(stripped) or self.keywords["major_phrases"].search(stripped):
+                flags |= MAJOR_KEYWORD
+            if not self.low_memory:
+                self._keyword_classes[text] = flags
+        return flags
+
+    def _make_candidate(self, text, text_lower, font_size, is_bold, page_num, y_coord, x_coord, style=None,
+                        size_ratio=0.0):
+        """Build a HeadingCandidate, settling its level and outline page from the profile."""
+        with self._stage("assign_levels"):
+            return self._settle_candidate(text, text_lower, font_size, is_bold, page_num, y_coord, x_coord, style,
+                                          size_ratio)
 
-        is_file03 = "file03" in self.input_path
-        is_file04 = "file04" in self.input_path
-        is_file05 = "file05" in self.input_path
+    def _settle_candidate(self, text, text_lower, font_size, is_bold, page_num, y_coord, x_coord, style=None,
+                          size_ratio=0.0):
+        """Level and outline page of a new candidate. Under style_levels the level is
+        provisional (and not cut at max_level) until _assign_levels consults the
+        StyleIndex, so the outline page is settled for every candidate."""
+        profile = self.profile
+        line_class = classify_line(text)
+        if line_class.is_numbered:
+            level = line_class.numbering_level
+        else:
+            level = _first_match(profile.level_rules, self, text, text_lower, font_size, is_bold, page_num)
 
-        for text, font_size, is_bold, page_num, y_coord, x_coord in sorted_headings:
+        outline_page = None
+        if profile.style_levels or (level and (self.max_level is None or int(level[1:]) <= self.max_level)):
+            outline_page = _first_match(profile.page_rules, self, text, text_lower, font_size, is_bold, page_num)
+            if outline_page is None:
+                outline_page = page_num + profile.page_offset
+        else:
             level = None
 
-            if self._is_numbered_heading(text):
-                if re.match(r'^(\d+)\.\s+', text):
-                    level = "H1"
-                elif re.match(r'^(\d+\.\d+)\s+', text):
-                    level = "H2"
-                elif re.match(r'^(\d+\.\d+\.\d+)\s+', text):
-                    level = "H3"
-                elif re.match(r'^(\d+)\s+', text):
-                    level = "H1"
+        # Numbered headings keep their numbering level, so they carry no style for StyleIndex to override.
+        return HeadingCandidate(text, text_lower, page_num, y_coord, x_coord,
+                                line_class.numbering_depth if line_class.is_numbered else 0,
+                                self._keyword_class(text), size_ratio, level, outline_page,
+                                None if line_class.is_numbered else style)
+
+    def _assign_levels(self, sorted_headings):
+        """Outline entries for candidates in reading order; levels were settled at creation,
+        except that a style_levels profile levels unnumbered candidates by the StyleIndex
+        of all scanned pages."""
+        suffix = self.profile.heading_suffix
+        with self._stage("assign_levels"):
+            if self.profile.style_levels:
+                outline = self._style_outline(sorted_headings, suffix)
             else:
-                text_lower = text.lower().strip()
-                
-                if is_file03:
-                    if any(h1_text in text_lower for h1_text in [
-                        "ontario's digital library", "ontario\u2019s digital library",
-                        "a critical component for implementing ontario's road map to prosperity strategy",
-                        "a critical component for implementing ontario's road map to"
-                    ]):
-                        level = "H1"
-                    elif any(h2_text in text_lower for h2_text in [
-                        "summary", "background", "the business plan to be developed",
-                        "what could the odl really mean?", "approach and specific proposal requirements", 
-                        "evaluation and awarding of contract", "appendix a: odl envisioned phases & funding",
-                        "appendix b: odl steering committee terms of reference",
-                        "appendix c: odl's envisioned electronic resources"
-                    ]):
-                        level = "H2"
-                    elif any(h3_text in text_lower for h3_text in [
-                        "timeline:", "equitable access for all ontarians:", "shared decision-making and accountability:",
-                        "shared governance structure:", "shared funding:", "local points of entry:", 
-                        "access:", "guidance and advice:", "training:", "provincial purchasing & licensing:", 
-                        "technological support:", "milestones", "phase i: business planning", 
-                        "phase ii: implementing and transitioning", "phase iii: operating and growing the odl", 
-                        "1. preamble", "2. terms of reference", "3. membership", 
-                        "4. appointment criteria and process", "5. term", "6. chair", 
-                        "7. meetings", "8. lines of accountability and communication", 
-                        "9. financial and administrative policies"
-                    ]):
-                        level = "H3"
-                    elif any(h4_text in text_lower for h4_text in [
-                        "for each ontario citizen it could mean:", "for each ontario student it could mean:",
-                        "for each ontario library it could mean:", "for the ontario government it could mean:"
-                    ]):
-                        level = "H4"
-                    elif font_size >= 20:
-                        level = "H1"
-                    elif font_size >= 14 or is_bold:
-                        level = "H2"
-                    else:
-                        level = "H3"
-                elif is_file04:
-                    if text.strip() == "PATHWAY OPTIONS":
-                        level = "H1"
-                elif is_file05:
-                    if "HOPE" in text and "THERE" in text:
-                        level = "H1"
-                else:
-                    major_keywords = [
-                        "revision history", "table of contents", "acknowledgements", "acknowledgments",
-                        "references", "appendix", "abstract", "executive summary", "conclusion",
-                        "introduction", "overview", "summary", "background"
-                    ]
-                    
-                    if any(keyword == text_lower or text_lower.startswith(keyword) for keyword in major_keywords):
-                        level = "H1"
-                    elif any(word in text_lower for word in ["introduction to", "overview of"]):
-                        level = "H1"
-                    elif font_size >= 14:
-                        level = "H1"
-                    elif font_size >= 12 or is_bold:
-                        level = "H2"
-                    elif font_size >= 10:
-                        level = "H3"
-
-            if level:
-                if is_file04:
-                    text_with_space = text.rstrip()
-                else:
-                    text_with_space = text.rstrip() + " "
-                
-                is_file01 = "file01" in self.input_path
-                is_file02 = "file02" in self.input_path
-                
-                if is_file01 or is_file02:
-                    adjusted_page = page_num
+                outline = [{"level": candidate.level, "text": candidate.text.rstrip() + suffix,
+                            "page": candidate.outline_page}
+                           for candidate in sorted_headings if candidate.level]
+        if self.metrics:
+            self.metrics.count("headings", len(outline))
+        return outline
+
+    def _style_outline(self, sorted_headings, suffix):
+        style_levels = StyleIndex(self._page_style_counts.values()).levels
+        max_level = self.max_level
+        outline = []
+        for candidate in sorted_headings:
+            level = style_levels.get(candidate.style, candidate.level)
+            if level and (max_level is None or int(level[1:]) <= max_level):
+                outline.append({"level": level, "text": candidate.text.rstrip() + suffix,
+                                "page": candidate.outline_page})
+        return outline
+
+    def _extract_page_range(self, start, stop):
+        """Collect heading candidates for 0-based pages start..stop-1 in page order."""
+        potential_headings = []
+        if self.page_cache:
+            self._lookup_page_cache(range(start, stop))
+        if not (self.low_memory or self.page_store or self.page_cache):
+            self._build_font_stats(range(start, stop))
+        for index in range(start, stop):
+            potential_headings.extend(self._extract_page(index))
+        self._flush_page_stores()
+        return potential_headings
+
+    def _extract_page(self, index):
+        """Heading candidates of one 0-based page, releasing its text right after in low-memory mode."""
+        page = self.doc[index]
+        if self.page_store or self.page_cache:
+            potential_headings = self._merge_page_ranges([self._stored_page_candidates(index, page)])
+        else:
+            potential_headings = self._extract_potential_headings_from_page(index + 1, page)
+        if self.low_memory:
+            self._release_page(index)
+        return potential_headings
+
+    def _page_store_config(self):
+        """Hash of the settings that shape stored candidates, so changing any of them misses the store."""
+        config = {"version": EXTRACTOR_VERSION, "profile": self.profile.name, "max_level": self.max_level,
+                  "keyword_config": _file_sha256(self.keyword_config) if self.keyword_config else None,
+                  "profile_config": _file_sha256(self.profile_config) if self.profile_config else None}
+        return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+    def _get_page_fingerprint(self, index):
+        fingerprint = self._page_fingerprints.get(index)
+        if fingerprint is None:
+            with self._stage("fingerprint"):
+                fingerprint = self._page_fingerprints[index] = _page_fingerprint(self.doc, self.doc[index],
+                                                                                 self._object_digests)
+        return fingerprint
+
+    def _candidates_cache_key(self, index):
+        return f"candidates:{self._get_page_store_config()}:{index + 1}:{self._get_page_fingerprint(index)}"
+
+    def _get_page_store_config(self):
+        if self._page_store_config_key is None:
+            self._page_store_config_key = self._page_store_config()
+        return self._page_store_config_key
+
+    def _lookup_page_cache(self, indexes, candidates=True):
+        """Fetch the shared page cache's span tables (and candidates) for these pages in one query."""
+        keys = {}
+        for index in indexes:
+            for kind in ("spans", "candidates") if candidates else ("spans",):
+                if (kind, index) in self._page_cache_looked_up:
+                    continue
+                self._page_cache_looked_up.add((kind, index))
+                if kind == "spans":
+                    keys[f"spans:{EXTRACTOR_VERSION}:{self._get_page_fingerprint(index)}"] = (kind, index)
                 else:
-                    adjusted_page = page_num + 1
-                
-                text_lower = text.strip().lower()
-                if ("ontario's digital library" in text_lower):
-                    adjusted_page = 1
-                elif ("a critical component" in text_lower or
-                    "summary" == text_lower or
-                    "timeline:" == text_lower):
-                    adjusted_page = 1
-                elif "background" == text_lower:
-                    adjusted_page = 2
-                
-                if is_file04 and text.strip() == "PATHWAY OPTIONS":
-                    adjusted_page = 0
-                
-                if is_file05 and "HOPE" in text and "THERE" in text:
-                    adjusted_page = 0
-                
-                outline.append({
-                    "level": level,
-                    "text": text_with_space,
-                    "page": adjusted_page
-                })
+                    keys[self._candidates_cache_key(index)] = (kind, index)
+        if not keys:
+            return
+        for key, value in _get_result_cache(self.page_cache).get_many(keys).items():
+            kind, index = keys[key]
+            if kind == "spans":
+                self._span_tables.setdefault(index, [(text, size, flags, tuple(bbox), block_no, line_no, font)
+                                                     for text, size, flags, bbox, block_no, line_no, font in value])
+            else:
+                self._cached_candidates[index] = value
+
+    def _get_stored_pages(self):
+        if self._stored_pages is None:
+            self._stored_pages = _get_page_store(self.page_store).load(self.document_key,
+                                                                       self._get_page_store_config())
+        return self._stored_pages
+
+    def _page_reused(self, index):
+        """Whether scanning this page will take its candidates from the page store or page cache
+        instead of parsing it."""
+        if self.page_store:
+            stored = self._get_stored_pages().get(index)
+            if stored and stored[0] == self._get_page_fingerprint(index):
+                return True
+        if self.page_cache:
+            self._lookup_page_cache([index])
+            return index in self._cached_candidates
+        return False
+
+    def _stored_page_candidates(self, index, page):
+        """A page's candidates before cross-page dedupe: from the page store when its fingerprint
+        is unchanged, else from the shared page cache, else by scanning the page. New results
+        are queued for _flush_page_stores."""
+        fingerprint = self._get_page_fingerprint(index)
+        if self.page_store:
+            stored = self._get_stored_pages().get(index)
+            if stored and stored[0] == fingerprint:
+                candidates = self._restore_page(index, json.loads(stored[1]))
+                if self.metrics:
+                    self.metrics.count("pages_reused")
+                    self.metrics.count("candidates", len(candidates))
+                return candidates
+
+        if self.page_cache:
+            self._lookup_page_cache([index])
+        saved = self._cached_candidates.pop(index, None)
+        if saved is not None:
+            candidates = self._restore_page(index, saved)
+            if self.metrics:
+                self.metrics.count("pages_shared")
+                self.metrics.count("candidates", len(candidates))
+        else:
+            lines = self._get_page_lines(page)
+            line_styles = self._get_line_styles(page)
+            with self._stage("candidates"):
+                candidates = self._filter_candidates(index + 1, lines, dedupe=False, line_styles=line_styles)
+            saved = {"candidates": [candidate.__getstate__() for candidate in candidates],
+                     "styles": self._page_style_counts.get(index)}
+            if self.page_cache:
+                self._page_cache_updates[self._candidates_cache_key(index)] = saved
+        if self.page_store:
+            self._page_store_updates.append((index, fingerprint, json.dumps(saved)))
+        return candidates
+
+    def _restore_page(self, index, saved):
+        """Candidates (and StyleIndex counts) of a page saved by _stored_page_candidates."""
+        if saved["styles"] is not None:
+            self._page_style_counts[index] = saved["styles"]
+        return [HeadingCandidate(*state) for state in saved["candidates"]]
+
+    def _flush_page_stores(self):
+        """Write queued page store rows and shared page cache entries."""
+        if self._page_store_updates:
+            _get_page_store(self.page_store).save(self.document_key, self._get_page_store_config(),
+                                                  self._page_store_updates, len(self.doc))
+            self._page_store_updates = []
+        if self._page_cache_updates:
+            _get_result_cache(self.page_cache).put_many(self._page_cache_updates)
+            self._page_cache_updates = {}
+
+    def _release_page(self, index):
+        """Forget a page's span table and lines, trim MuPDF's store and sample RSS."""
+        self._span_tables.pop(index, None)
+        self._page_line_styles.pop(index, None)
+        self._page_lines.pop(index, None)
+        self._page_modal_sizes.pop(index, None)
+        store_size = fitz.TOOLS.store_size
+        if store_size > LOW_MEMORY_STORE_BYTES:
+            fitz.TOOLS.store_shrink(-(-(store_size - LOW_MEMORY_STORE_BYTES) * 100 // store_size))
+        rss = _current_rss_bytes()
+        if rss is not None:
+            self.peak_rss_bytes = max(self.peak_rss_bytes or 0, rss)
+
+    def _merge_page_ranges(self, range_results):
+        """Splice per-range candidates back together with the sequential cross-page dedupe.
+
+        Each range was deduplicated on its own, so a candidate survives only if its
+        text was not already accepted from an earlier range.
+        """
+        merged = []
+        for potential_headings in range_results:
+            for heading in potential_headings:
+                if heading.text_lower not in self.global_seen_headings:
+                    self.global_seen_headings.add(heading.text_lower)
+                    merged.append(heading)
+                elif self.metrics:
+                    self.metrics.reject("seen_on_earlier_page")
+                    self.metrics.count("candidates", -1)
+        return merged
+
+    def _collect_potential_headings(self, page_workers=1, first=0, last=None):
+        """Candidates for 0-based pages first..last-1 (default: the whole document)."""
+        last = len(self.doc) if last is None else last
+        page_count = last - first
+        if page_workers <= 1 or page_count < PAGE_PARALLEL_MIN_PAGES:
+            return self._extract_page_range(first, last)
 
+        chunk_size = max(PAGE_PARALLEL_MIN_CHUNK, -(-page_count // (page_workers * 4)))
+        starts = list(range(first, last, chunk_size))
+        stops = [min(start + chunk_size, last) for start in starts]
+        range_results = []
+        with ProcessPoolExecutor(max_workers=page_workers) as executor:
+            for potential_headings, worker_metrics, style_counts in executor.map(
+                    _extract_page_range_worker, [self.source] * len(starts), starts, stops,
+                    [self._worker_options()] * len(starts)):
+                range_results.append(potential_headings)
+                self._page_style_counts.update(style_counts)
+                if worker_metrics:
+                    self.metrics.merge(worker_metrics)
+        return self._merge_page_ranges(range_results)
+
+    def _worker_options(self):
+        """Constructor keyword arguments that recreate this extractor's configuration in another process."""
+        return {"keyword_config": self.keyword_config, "profile": self.profile.name,
+                "profile_config": self.profile_config, "max_level": self.max_level,
+                "name": None if _is_pdf_path(self.source) else self.input_path, "low_memory": self.low_memory,
+                "metrics": self.metrics is not None, "page_store": self.page_store,
+                "document_key": self.document_key, "page_cache": self.page_cache}
+
+    def _is_trustworthy_toc(self, toc):
+        """Decide whether the PDF's bookmarks can stand in for heuristic extraction.
+
+        The tree must be well formed (starts at level 1, never skips a level, points at
+        real pages mostly in reading order), have heading-like titles, and a sample of
+        entries must actually appear on the pages they point to.
+        """
+        if len(toc) < TOC_MIN_ENTRIES:
+            return False
+        page_count = len(self.doc)
+        previous_level = 0
+        previous_page = 0
+        out_of_order = 0
+        for level, title, page in toc:
+            if level < 1 or level > previous_level + 1:
+                return False
+            if not 1 <= page <= page_count:
+                return False
+            text = title.strip()
+            if not text or len(text.split()) > MAX_HEADING_WORD_COUNT:
+                return False
+            if page < previous_page:
+                out_of_order += 1
+            previous_level = level
+            previous_page = page
+        if out_of_order > len(toc) * (1 - TOC_MIN_ORDERED_FRACTION):
+            return False
+
+        sample_step = max(1, len(toc) // TOC_VERIFY_SAMPLE)
+        sample = toc[::sample_step][:TOC_VERIFY_SAMPLE]
+        found = 0
+        for level, title, page in sample:
+            page_text = " ".join(self.doc[page - 1].get_text("text").lower().split())
+            if " ".join(title.lower().split())[:40] in page_text:
+                found += 1
+        return found * 2 >= len(sample)
+
+    def _outline_from_toc(self, first=0, last=None):
+        """Map the embedded bookmarks to outline entries, or None when they can't be trusted.
+
+        Only bookmarks pointing into 0-based pages first..last-1 and no deeper than
+        max_level are kept; trust is judged on the whole tree.
+        """
+        with self._stage("toc"):
+            toc = self.doc.get_toc(simple=True)
+            trusted = self._is_trustworthy_toc(toc)
+        if not trusted:
+            return None
+        last = len(self.doc) if last is None else last
+        max_level = TOC_MAX_LEVEL if self.max_level is None else min(self.max_level, TOC_MAX_LEVEL)
+        outline = [{
+            "level": f"H{min(level, TOC_MAX_LEVEL)}",
+            "text": title.strip() + self.profile.heading_suffix,
+            "page": max(1, page - 1) + self.profile.page_offset,
+        } for level, title, page in toc if min(level, TOC_MAX_LEVEL) <= max_level and first < page <= last]
+        if self.metrics:
+            self.metrics.count("headings", len(outline))
         return outline
 
-    def process_pdf(self):
-        title = self._extract_title()
+    def _page_bounds(self, pages):
+        """Turn a 1-based inclusive (first, last) range into 0-based first..last-1 bounds."""
+        first, last = 0, len(self.doc)
+        if pages is not None:
+            first = max(pages[0], 1) - 1
+            last = min(last, pages[1]) if pages[1] is not None else last
+        return first, last
 
-        all_potential_headings = []
-        for i, page in enumerate(self.doc, start=1):
-            common_font_size = self._get_common_font_size(page)
-            all_potential_headings.extend(self._extract_potential_headings_from_page(i, page, common_font_size))
+    def iter_outline(self, pages=None):
+        """Yield outline entries as soon as they are final, scanning one page at a time.
+
+        Produces the same entries, in the same order, as process_pdf()["outline"]. A
+        candidate is released once no later page can still sort ahead of it, which for
+        the usual page - 1 numbering is one page behind the scan. A style_levels profile
+        needs every page's styles first, so it yields only after the last page. Unlike
+        process_pdf this leaves the document open; close extractor.doc when done.
+        """
+        first, last = self._page_bounds(pages)
+        outline = self._outline_from_toc(first, last) if self.profile.use_embedded_outline else None
+        if outline is not None:
+            yield from outline
+            return
+
+        pending = []
+        for index in range(first, last):
+            pending.extend(self._extract_page(index))
+            if index == last - 1:
+                self._flush_page_stores()
+            if not pending or self.profile.style_levels:
+                continue
+            with self._stage("sort"):
+                pending.sort(key=CANDIDATE_ORDER)
+            floor = self.profile.earliest_candidate_page(index + 1)
+            ready = 0
+            while ready < len(pending) and pending[ready].page < floor:
+                ready += 1
+            if ready:
+                yield from self._assign_levels(pending[:ready])
+                del pending[:ready]
+        if self.profile.style_levels:
+            with self._stage("sort"):
+                pending.sort(key=CANDIDATE_ORDER)
+        yield from self._assign_levels(pending)
+
+    def process_pdf(self, page_workers=1, title_only=False, pages=None):
+        """Extract {"title", "outline"} and close the document.
 
-        sorted_headings = sorted(all_potential_headings, key=lambda x: (x[3], x[4], x[5]))
+        title_only skips page scanning altogether and returns an empty outline. pages is
+        a 1-based inclusive (first, last) range to scan, last None meaning the final page;
+        the title always comes from page 1. Set max_level on the extractor to drop deeper
+        entries. In low-memory mode a single-process scan streams through iter_outline, so
+        only candidates that can still be reordered are held.
+        """
+        first, last = self._page_bounds(pages)
+        # Page 1 is parsed by this process's scan unless the scan skips it, hands it to a page
+        # worker or reuses its candidates from the page store or page cache.
+        scans_first_page = (not title_only and first == 0 < last
+                            and (page_workers <= 1 or last - first < PAGE_PARALLEL_MIN_PAGES)
+                            and not ((self.page_store or self.page_cache) and self._page_reused(0)))
+        with self._stage("title"):
+            title = self._extract_title(full_page=scans_first_page)
+        if title_only:
+            self._flush_page_stores()
+            self.doc.close()
+            return {"title": title, "outline": []}
 
-        outline = self._assign_levels(sorted_headings)
+        if self.low_memory and page_workers <= 1:
+            outline = list(self.iter_outline(pages))
+            self.doc.close()
+            return {"title": title, "outline": outline}
+
+        outline = self._outline_from_toc(first, last) if self.profile.use_embedded_outline else None
+        if outline is None:
+            all_potential_headings = self._collect_potential_headings(page_workers, first, last)
+
+            with self._stage("sort"):
+                sorted_headings = sorted(all_potential_headings, key=CANDIDATE_ORDER)
+
+            outline = self._assign_levels(sorted_headings)
+        self._flush_page_stores()
         self.doc.close()
         return {"title": title, "outline": outline}
 
@@ -543,19 +1755,13 @@ class PDFOutlineExtractor:
             return
             
         page = self.doc[page_num - 1]
-        blocks = page.get_text('dict').get('blocks', [])
         
         print(f'=== PAGE {page_num} CONTENT ===')
-        for b in blocks:
-            if b['type'] == 0:
-                for l in b.get('lines', []):
-                    line_text = ''
-                    for span in l.get('spans', []):
-                        line_text += span['text']
-                    text = line_text.strip()
-                    if len(text) > 3:
-                        if show_all or len(text) > 8:
-                            print(f'Text: "{text}"')
+        for line_text, font_size, is_bold, y_coord, x_coord in self._get_page_lines(page):
+            text = line_text.strip()
+            if len(text) > 3:
+                if show_all or len(text) > 8:
+                    print(f'Text: "{text}"')
 
     def debug_search_pages(self, keywords=None, max_pages=3):
         """Debug method to search for keywords across pages - from debug_pages.py"""
@@ -564,20 +1770,14 @@ class PDFOutlineExtractor:
         
         for page_num in range(min(max_pages, len(self.doc))):
             page = self.doc[page_num]
-            blocks = page.get_text('dict').get('blocks', [])
             
             print(f'=== PAGE {page_num + 1} CONTENT ===')
             found_any = False
-            for b in blocks:
-                if b['type'] == 0:
-                    for l in b.get('lines', []):
-                        line_text = ''
-                        for span in l.get('spans', []):
-                            line_text += span['text']
-                        text = line_text.strip()
-                        if len(text) > 8 and any(keyword in text.lower() for keyword in keywords):
-                            print(f'Text: "{text}"')
-                            found_any = True
+            for line_text, font_size, is_bold, y_coord, x_coord in self._get_page_lines(page):
+                text = line_text.strip()
+                if len(text) > 8 and any(keyword in text.lower() for keyword in keywords):
+                    print(f'Text: "{text}"')
+                    found_any = True
             if not found_any:
                 print("No matching text found.")
             print()
@@ -592,32 +1792,20 @@ class PDFOutlineExtractor:
             return
             
         page = self.doc[page_num - 1]
-        blocks = page.get_text('dict').get('blocks', [])
 
         print(f'=== DETAILED PAGE {page_num} DEBUG ===')
-        for b in blocks:
-            if b['type'] == 0:
-                for l in b.get('lines', []):
-                    line_text = ''
-                    line_font_size = 0
-                    line_is_bold = False
-                    
-                    for span in l.get('spans', []):
-                        line_text += span['text']
-                        line_font_size = max(line_font_size, span['size'])
-                        line_is_bold = line_is_bold or bool(span['flags'] & 2)
-                    
-                    text = line_text.strip()
-                    
-                    if text and len(text) > 3:
-                        text_lower = text.lower()
-                        is_target = any(target in text_lower for target in target_headings)
-                        if is_target or len(text) > 10:
-                            print(f'Text: "{text}"')
-                            print(f'  Lower: "{text_lower}"')
-                            print(f'  Font size: {line_font_size}, Bold: {line_is_bold}')
-                            print(f'  Target match: {is_target}')
-                            print()
+        for line_text, line_font_size, line_is_bold, y_coord, x_coord in self._get_page_lines(page):
+            text = line_text.strip()
+            
+            if text and len(text) > 3:
+                text_lower = text.lower()
+                is_target = any(target in text_lower for target in target_headings)
+                if is_target or len(text) > 10:
+                    print(f'Text: "{text}"')
+                    print(f'  Lower: "{text_lower}"')
+                    print(f'  Font size: {line_font_size}, Bold: {line_is_bold}')
+                    print(f'  Target match: {is_target}')
+                    print()
 
     def debug_all_pages_summary(self):
         """Debug method to get a summary of all pages"""
@@ -627,8 +1815,7 @@ class PDFOutlineExtractor:
         
         for page_num in range(len(self.doc)):
             page = self.doc[page_num]
-            text = page.get_text()
-            word_count = len(text.split())
+            word_count = sum(len(line[0].split()) for line in self._get_page_lines(page))
             print(f'Page {page_num + 1}: {word_count} words')
 
     def debug_heading_detection(self, page_num=None):
@@ -644,12 +1831,26 @@ class PDFOutlineExtractor:
             common_font_size = self._get_common_font_size(page)
             print(f'Page {i + 1} - Common font size: {common_font_size}')
             
-            headings = self._extract_potential_headings_from_page(i + 1, page, common_font_size)
+            headings = self._extract_potential_headings_from_page(i + 1, page)
             print(f'Found {len(headings)} potential headings:')
-            for text, font_size, is_bold, page_num, y_coord, x_coord in headings:
-                print(f'  "{text}" (font: {font_size}, bold: {is_bold}, page: {page_num})')
+            for heading in headings:
+                print(f'  "{heading.text}" (level: {heading.level}, page: {heading.page}, '
+                      f'size ratio: {heading.size_ratio}, keyword class: {heading.keyword_class})')
             print()
 
+def _extract_page_range_worker(source, start, stop, extractor_options):
+    """Open a private document handle and extract one page range. Runs in pool workers.
+
+    Returns (candidates, metrics dict or None, {page index: style counts} for StyleIndex).
+    """
+    extractor = PDFOutlineExtractor(source, **extractor_options)
+    try:
+        potential_headings = extractor._extract_page_range(start, stop)
+        return (potential_headings, extractor.metrics.to_dict() if extractor.metrics else None,
+                extractor._page_style_counts)
+    finally:
+        extractor.doc.close()
+
 def debug_pdf_analysis(pdf_file_path):
     """Function to run comprehensive debug analysis on a PDF file"""
     print(f"\n{'='*60}")
@@ -785,6 +1986,249 @@ def test_validation_logic():
     except Exception as e:
         print(f"Error during validation testing: {str(e)}")
 
+def _legacy_classify_line(text):
+    """Pattern-by-pattern classification as it was done before LINE_CLASSIFIER_RE, kept as the
+    baseline for benchmark_line_classifier."""
+    stripped = text.strip()
+    is_date = not stripped
+    for pattern in [
+        r'^\d{1,2}[-/]\d{1,2}[-/]\d{2,4}$',
+        r'^\d{4}$',
+        r'^(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{1,2},?\s+\d{4}$',
+        r'^\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{4}$',
+    ]:
+        if stripped and re.fullmatch(pattern, stripped, re.IGNORECASE):
+            is_date = True
+    if stripped.replace('.', '').replace(' ', '').isdigit():
+        is_date = True
+    if re.fullmatch(r'(page|p\.?)\s*\d+', stripped, re.IGNORECASE):
+        is_date = True
+
+    is_numbered = False
+    for pattern in [r'^(\d+)\.\s+', r'^(\d+\.\d+)\s+', r'^(\d+\.\d+\.\d+)\s+', r'^(\d+)\s+']:
+        match = re.match(pattern, text)
+        if match and len(text[len(match.group(0)):].strip()) > 3:
+            is_numbered = True
+    if re.match(r'^\d+\.\s+\w+', text):
+        is_numbered = True
+
+    level = None
+    if is_numbered:
+        if re.match(r'^(\d+)\.\s+', text):
+            level = "H1"
+        elif re.match(r'^(\d+\.\d+)\s+', text):
+            level = "H2"
+        elif re.match(r'^(\d+\.\d+\.\d+)\s+', text):
+            level = "H3"
+        elif re.match(r'^(\d+)\s+', text):
+            level = "H1"
+    return is_date, is_numbered, level
+
+def benchmark_line_classifier(rounds=20):
+    """Micro-benchmark: lines classified per second, legacy patterns vs. LINE_CLASSIFIER_RE."""
+    lines = [
+        "1. Introduction", "2.1 Intended Audience", "2.1.1 Details", "3 Summary", "Revision History",
+        "March 21, 2003", "12/05/2024", "Page 7", "2024", "Appendix A: ODL Envisioned Phases & Funding",
+        "This is a long sentence that should not be a heading", "4 credits of Math", "1.2.3.4.5 Too deep",
+    ]
+    current_dir = Path(__file__).parent
+    for pdf_file in sorted(current_dir.glob("input/*.pdf")):
+        extractor = PDFOutlineExtractor(str(pdf_file))
+        for page in extractor.doc:
+            lines.extend(line[0].strip() for line in extractor._get_page_lines(page))
+        extractor.doc.close()
+    lines = [line for line in lines if line]
+
+    mismatches = 0
+    for line in lines:
+        line_class = classify_line.__wrapped__(line)
+        expected = _legacy_classify_line(line)
+        if (line_class.is_date_or_page_number, line_class.is_numbered,
+                line_class.numbering_level if line_class.is_numbered else None) != expected:
+            mismatches += 1
+
+    def lines_per_second(classify):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for line in lines:
+                classify(line)
+        return rounds * len(lines) / (time.perf_counter() - start)
+
+    before = lines_per_second(_legacy_classify_line)
+    after = lines_per_second(classify_line.__wrapped__)
+    classify_line.cache_clear()
+    cached = lines_per_second(classify_line)
+
+    print(f"Lines: {len(lines)} x {rounds} rounds, mismatches: {mismatches}")
+    print(f"  legacy patterns:        {before:12,.0f} lines/s")
+    print(f"  combined classifier:    {after:12,.0f} lines/s ({after / before:.1f}x)")
+    print(f"  combined + memoization: {cached:12,.0f} lines/s ({cached / before:.1f}x)")
+    return {"lines": len(lines), "mismatches": mismatches, "legacy": before, "combined": after, "cached": cached}
+
+SYNTHETIC_BOLD_FONTS = {"helv": "hebo", "tiro": "tibo", "cour": "cobo"}
+_SYNTHETIC_WORDS = (
+    "project", "budget", "network", "library", "system", "review", "program", "service", "report",
+    "analysis", "funding", "schedule", "partner", "content", "access", "digital", "training", "policy",
+    "the", "of", "and", "for", "with", "across", "within", "to", "each", "our", "new", "public",
+)
+_SYNTHETIC_HEADINGS = (
+    "Introduction", "Background", "Summary", "Overview", "Methodology", "Approach", "Results",
+    "Discussion", "Conclusion", "Timeline", "References", "Appendix", "Evaluation", "Milestones",
+)
+BENCHMARK_CASES = [
+    {"name": "short-numbered", "pages": 5, "spans_per_page": 30, "heading_density": 0.15, "numbering": "dotted"},
+    {"name": "report-numbered", "pages": 60, "spans_per_page": 40, "heading_density": 0.08,
+     "numbering": "dotted", "fonts": ("helv", "tiro")},
+    {"name": "report-keywords", "pages": 60, "spans_per_page": 40, "heading_density": 0.08,
+     "numbering": "none", "fonts": ("tiro",)},
+    {"name": "dense-text", "pages": 30, "spans_per_page": 150, "heading_density": 0.02,
+     "numbering": "mixed", "fonts": ("helv", "tiro", "cour")},
+    {"name": "long-plain", "pages": 300, "spans_per_page": 40, "heading_density": 0.05, "numbering": "plain"},
+]
+
+def _synthetic_heading(rng, counters, depth, numbering):
+    counters[depth - 1] += 1
+    counters[depth:] = [0] * (len(counters) - depth)
+    title = rng.choice(_SYNTHETIC_HEADINGS)
+    if depth > 1 or rng.random() < 0.5:
+        title += " " + " ".join(rng.choices(_SYNTHETIC_WORDS[:18], k=rng.randint(1, 3))).title()
+    scheme = rng.choice(("dotted", "plain", "none")) if numbering == "mixed" else numbering
+    if scheme == "none":
+        return title
+    number = ".".join(str(max(counter, 1)) for counter in counters[:depth])
+    if depth == 1:
+        number += "." if scheme == "dotted" else ""
+    return f"{number} {title}"
+
+def generate_synthetic_pdf(pages=20, spans_per_page=40, heading_density=0.1, fonts=("helv",), numbering="dotted",
+                           seed=0):
+    """Build a synthetic report with PyMuPDF and return it as PDF bytes.
+
+    Page 1 opens with a large bold title. Each page then carries about spans_per_page
+    spans: body lines of several spans in fonts drawn from fonts (base-14 names with a
+    bold variant in SYNTHETIC_BOLD_FONTS), and with probability heading_density a bold
+    H1-H3 heading numbered "dotted" (1. / 1.1), "plain" (1 / 1.1), "none" or "mixed".
+    """
+    rng = random.Random(seed)
+    counters = [0, 0, 0]
+    doc = fitz.open()
+    for page_index in range(pages):
+        page = doc.new_page()
+        y = 72
+        if page_index == 0:
+            title = "Synthetic " + " ".join(rng.choices(_SYNTHETIC_WORDS[:18], k=4)).title() + " Report"
+            page.insert_text((72, y), title, fontsize=22, fontname=SYNTHETIC_BOLD_FONTS[fonts[0]])
+            y += 40
+        lines = max(1, min(spans_per_page, int((page.rect.height - 72 - y) / 14)))
+        spans_per_line = -(-spans_per_page // lines)
+        for _ in range(lines):
+            if rng.random() < heading_density:
+                depth = rng.choice((1, 1, 2, 2, 3))
+                size = {1: 16, 2: 14, 3: 12}[depth]
+                page.insert_text((72, y + size - 10), _synthetic_heading(rng, counters, depth, numbering),
+                                 fontsize=size, fontname=SYNTHETIC_BOLD_FONTS[rng.choice(fonts)])
+                y += size + 8
+            else:
+                x = 72
+                for _ in range(spans_per_line):
+                    fontname = rng.choice(fonts)
+                    text = " ".join(rng.choices(_SYNTHETIC_WORDS, k=rng.randint(2, 5))) + " "
+                    page.insert_text((x, y), text, fontsize=10, fontname=fontname)
+                    x += fitz.get_text_length(text, fontname=fontname, fontsize=10)
+                y += 14
+            if y > page.rect.height - 60:
+                break
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def _stage_summary(samples):
+    return {"min": round(min(samples), 6), "median": round(statistics.median(samples), 6),
+            "mean": round(statistics.fmean(samples), 6)}
+
+def benchmark_extraction_stages(data, rounds=3):
+    """Time the extraction stages on one PDF: title, page parsing + font statistics,
+    per-page candidate extraction and level assignment.
+
+    Levels are settled by the level and page rules as each candidate is built, so the
+    extractor runs with metrics to time those rules apart from the candidate scan;
+    assign_levels is their time plus the final sort and outline pass.
+    """
+    stages = {"title": [], "parse": [], "candidates": [], "assign_levels": [], "total": []}
+    for _ in range(rounds):
+        classify_line.cache_clear()
+        started = time.perf_counter()
+        extractor = PDFOutlineExtractor(data, profile="default", metrics=True)
+        page_count = len(extractor.doc)
+        before_title = time.perf_counter()
+        extractor._extract_title()
+        after_title = time.perf_counter()
+        extractor._build_font_stats(range(page_count))
+        after_parse = time.perf_counter()
+        candidates = []
+        for index in range(page_count):
+            candidates.extend(extractor._extract_page(index))
+        after_candidates = time.perf_counter()
+        level_rules = extractor.metrics.seconds.get("assign_levels", 0.0)
+        outline = extractor._assign_levels(sorted(candidates, key=CANDIDATE_ORDER))
+        finished = time.perf_counter()
+        extractor.doc.close()
+        stages["title"].append(after_title - before_title)
+        stages["parse"].append(after_parse - after_title)
+        stages["candidates"].append(after_candidates - after_parse - level_rules)
+        stages["assign_levels"].append(level_rules + finished - after_candidates)
+        stages["total"].append(finished - started)
+    summary = {stage: _stage_summary(samples) for stage, samples in stages.items()}
+    summary["candidates"]["per_page_ms"] = round(summary["candidates"]["median"] * 1000 / max(page_count, 1), 4)
+    return {"pages": page_count, "pages_skipped": extractor.pages_skipped, "candidates": len(candidates),
+            "outline_entries": len(outline), "seconds": summary}
+
+def run_benchmarks(output_path="benchmark_results.json", rounds=3, case_names=None, baseline_path=None,
+                   save_pdfs=None):
+    """Generate the BENCHMARK_CASES corpus, time every case and write the results as JSON.
+
+    With baseline_path, each stage's median is also printed as a ratio to that earlier run.
+    """
+    cases = [case for case in BENCHMARK_CASES if not case_names or case["name"] in case_names]
+    baseline = {}
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = {case["name"]: case for case in json.load(f)["cases"]}
+
+    results = []
+    for case in cases:
+        params = {key: value for key, value in case.items() if key != "name"}
+        data = generate_synthetic_pdf(**params)
+        if save_pdfs:
+            Path(save_pdfs).mkdir(parents=True, exist_ok=True)
+            (Path(save_pdfs) / f"{case['name']}.pdf").write_bytes(data)
+        result = dict(name=case["name"], params=params, bytes=len(data), **benchmark_extraction_stages(data, rounds))
+        results.append(result)
+
+        print(f"{case['name']}: {result['pages']} pages ({result['pages_skipped']} skipped by the pre-filter), "
+              f"{result['candidates']} candidates, {result['outline_entries']} entries")
+        for stage, timing in result["seconds"].items():
+            line = f"  {stage:<14} {timing['median'] * 1000:10.2f} ms"
+            previous = baseline.get(case["name"], {}).get("seconds", {}).get(stage)
+            if previous and previous["median"]:
+                line += f"  ({timing['median'] / previous['median']:.2f}x baseline)"
+            print(line)
+
+    report = {
+        "extractor_version": EXTRACTOR_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "pymupdf": fitz.VersionBind,
+        "machine": platform.machine(),
+        "rounds": rounds,
+        "cases": results,
+    }
+    if output_path:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output_path}")
+    return report
+
 def analyze_specific_file(file_name):
     """Analyze a specific PDF file in detail."""
     file_path = f'input/{file_name}'
@@ -814,12 +2258,12 @@ def analyze_specific_file(file_name):
     
     doc.close()
 
-def compare_outputs(file_name):
+def compare_outputs(file_name, current_dir='output', reference_dir='reference_output'):
     """Compare current output with reference for a specific file."""
     import json
     
-    current_path = f'output/{file_name}'
-    reference_path = f'reference_output/{file_name}'
+    current_path = f'{current_dir}/{file_name}'
+    reference_path = f'{reference_dir}/{file_name}'
     
     if not os.path.exists(current_path) or not os.path.exists(reference_path):
         print(f"Files not found: {current_path} or {reference_path}")
@@ -858,6 +2302,176 @@ def compare_outputs(file_name):
             
             print(f'{i+1:4d} | {curr["page"]:11d} | {ref["page"]:13d} | {text_match}{level_match}{page_match} {curr["text"][:25]}')
 
+    scores = summarize_scores(score_outline(current, reference))
+    overall = scores["levels"]["all"]
+    print(f'\nPrecision {overall["precision"]:.3f}  Recall {overall["recall"]:.3f}  F1 {overall["f1"]:.3f}  '
+          f'Page accuracy {scores["page_accuracy"]:.3f}')
+    return scores
+
+def _normalize_heading(text):
+    return " ".join(text.lower().split())
+
+def score_outline(predicted, reference):
+    """Count matches between a predicted and a reference {"title", "outline"}.
+
+    Entries are paired by normalized text (case and whitespace folded), first unused
+    reference entry first. A pair is a true positive for its level when the levels
+    agree; page accuracy is measured over all text-matched pairs. Returns raw counts
+    (see summarize_scores) so documents can be added together.
+    """
+    unused = {}
+    for index, entry in enumerate(reference["outline"]):
+        unused.setdefault(_normalize_heading(entry["text"]), []).append(index)
+    levels = {}
+    def level_counts(level):
+        return levels.setdefault(level, {"tp": 0, "fp": 0, "fn": 0})
+
+    text_matches = pages_correct = 0
+    matched = set()
+    for entry in predicted["outline"]:
+        candidates = unused.get(_normalize_heading(entry["text"]))
+        if not candidates:
+            level_counts(entry["level"])["fp"] += 1
+            continue
+        ref_index = candidates.pop(0)
+        matched.add(ref_index)
+        ref_entry = reference["outline"][ref_index]
+        text_matches += 1
+        pages_correct += entry["page"] == ref_entry["page"]
+        if entry["level"] == ref_entry["level"]:
+            level_counts(entry["level"])["tp"] += 1
+        else:
+            level_counts(entry["level"])["fp"] += 1
+            level_counts(ref_entry["level"])["fn"] += 1
+    for index, entry in enumerate(reference["outline"]):
+        if index not in matched:
+            level_counts(entry["level"])["fn"] += 1
+
+    return {"documents": 1, "titles_correct": int(_normalize_heading(predicted.get("title") or "") ==
+                                                   _normalize_heading(reference.get("title") or "")),
+            "text_matches": text_matches, "pages_correct": pages_correct, "levels": levels}
+
+def add_scores(total, scores):
+    """Add score_outline counts into total (modified in place and returned)."""
+    for key in ("documents", "titles_correct", "text_matches", "pages_correct"):
+        total[key] = total.get(key, 0) + scores[key]
+    levels = total.setdefault("levels", {})
+    for level, counts in scores["levels"].items():
+        level_total = levels.setdefault(level, {"tp": 0, "fp": 0, "fn": 0})
+        for key, value in counts.items():
+            level_total[key] += value
+    return total
+
+def summarize_scores(counts):
+    """Precision, recall and F1 per level and over all levels ("all", micro-averaged),
+    plus title and page accuracy, from score_outline / add_scores counts."""
+    def prf(tp, fp, fn):
+        precision = tp / (tp + fp) if tp + fp else 1.0
+        recall = tp / (tp + fn) if tp + fn else 1.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        return {"precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4),
+                "support": tp + fn}
+
+    levels = {level: prf(**level_counts) for level, level_counts in sorted(counts["levels"].items())}
+    levels["all"] = prf(*(sum(level_counts[key] for level_counts in counts["levels"].values())
+                          for key in ("tp", "fp", "fn")))
+    return {
+        "documents": counts["documents"],
+        "title_accuracy": round(counts["titles_correct"] / counts["documents"], 4) if counts["documents"] else 1.0,
+        "page_accuracy": round(counts["pages_correct"] / counts["text_matches"], 4) if counts["text_matches"] else 1.0,
+        "levels": levels,
+    }
+
+def evaluate_corpus(input_dir, reference_dir, workers=None, job=None, output_path=None, baseline_path=None,
+                    tolerance=0.0):
+    """Run the extractor over a labeled corpus in parallel and report accuracy next to speed.
+
+    Each PDF under input_dir is scored against the JSON at the same relative location
+    under reference_dir (PDFs without one are skipped). Prints per-level precision,
+    recall and F1, title and page accuracy, and throughput; writes them as JSON to
+    output_path. With baseline_path (an earlier output_path), prints both runs side by
+    side and returns False when any F1 or accuracy figure fell by more than tolerance.
+    """
+    labeled = []
+    for pdf_file in discover_pdfs(input_dir):
+        reference_file = _output_path(pdf_file, input_dir, reference_dir)
+        if reference_file.exists():
+            labeled.append((pdf_file, reference_file))
+    if not labeled:
+        print(f"No PDFs under {input_dir} have a reference JSON in {reference_dir}")
+        return None
+
+    workers = workers or os.cpu_count() or 1
+    totals = {}
+    documents = {}
+    extract_seconds = 0.0
+    failed = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_process_pdf_file, str(pdf_file), None, job): (pdf_file, reference_file)
+                   for pdf_file, reference_file in labeled}
+        for future in futures:
+            pdf_file, reference_file = futures[future]
+            with open(reference_file, encoding="utf-8") as f:
+                reference = json.load(f)
+            try:
+                record = future.result()
+                predicted = record["result"]
+                extract_seconds += record["seconds"]
+            except Exception as e:
+                print(f"Error processing {pdf_file.name}: {e}")
+                failed += 1
+                predicted = {"title": "", "outline": []}
+            scores = score_outline(predicted, reference)
+            add_scores(totals, scores)
+            documents[str(pdf_file)] = summarize_scores(scores)
+    wall_seconds = time.perf_counter() - started
+    page_count = 0
+    for pdf_file, _reference_file in labeled:
+        with fitz.open(pdf_file) as doc:
+            page_count += len(doc)
+
+    report = dict(summarize_scores(totals), failed=failed, pages=page_count, workers=workers,
+                  wall_seconds=round(wall_seconds, 4), extract_seconds=round(extract_seconds, 4),
+                  documents_per_second=round(len(labeled) / wall_seconds, 3),
+                  pages_per_second=round(page_count / wall_seconds, 3),
+                  extractor_version=EXTRACTOR_VERSION, per_document=documents)
+    baseline = None
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    def row(label, key, current, previous):
+        line = f"{label:<20} {current[key]:>9.3f}"
+        if previous is not None and key in previous:
+            line += f" {previous[key]:>9.3f} {current[key] - previous[key]:>+8.3f}"
+        print(line)
+
+    print(f"Evaluated {len(labeled)} documents ({page_count} pages, {failed} failed) with {workers} workers")
+    print(f"{'':<20} {'current':>9}" + (f" {'baseline':>9} {'delta':>8}" if baseline else ""))
+    for level, level_scores in report["levels"].items():
+        previous_level = baseline["levels"].get(level) if baseline else None
+        for key in ("precision", "recall", "f1"):
+            row(f"{level} {key}", key, level_scores, previous_level)
+    for key in ("title_accuracy", "page_accuracy", "documents_per_second", "pages_per_second"):
+        row(key, key, report, baseline)
+
+    if output_path:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output_path}")
+
+    if baseline:
+        regressions = [f"{level} f1" for level, level_scores in report["levels"].items()
+                       if level in baseline["levels"] and
+                       level_scores["f1"] < baseline["levels"][level]["f1"] - tolerance]
+        regressions += [key for key in ("title_accuracy", "page_accuracy")
+                        if report[key] < baseline[key] - tolerance]
+        if regressions:
+            print(f"Accuracy regressions against {baseline_path}: {', '.join(regressions)}")
+            return False
+    return True
+
 def debug_page_enumeration(file_name):
     """Debug page enumeration for heading detection."""
     file_path = f'input/{file_name}'
@@ -889,14 +2503,13 @@ def debug_heading_detection_for_file(file_name):
     extractor = PDFOutlineExtractor(file_path)
     
     for i, page in enumerate(extractor.doc, start=1):
-        common_font_size = extractor._get_common_font_size(page)
-        page_headings = extractor._extract_potential_headings_from_page(i, page, common_font_size)
+        page_headings = extractor._extract_potential_headings_from_page(i, page)
         
         if page_headings:
             print(f"\nPage {i} headings:")
             for heading in page_headings:
-                text, font_size, is_bold, page_num, y_coord, x_coord = heading
-                print(f'  "{text}" (font: {font_size}, bold: {is_bold}, page: {page_num})')
+                print(f'  "{heading.text}" (level: {heading.level}, page: {heading.page}, '
+                      f'size ratio: {heading.size_ratio}, keyword class: {heading.keyword_class})')
     
     extractor.doc.close()
 
@@ -999,49 +2612,1021 @@ def debug_page1_headings(file_name="file03.pdf"):
     
     doc.close()
 
-def process_pdfs():
+def _default_io_dirs():
     if os.path.exists("/app/input"):
-        input_dir = Path("/app/input")
-        output_dir = Path("/app/output")
+        return Path("/app/input"), Path("/app/output")
+    current_dir = Path(__file__).parent
+    return current_dir / "input", current_dir / "output"
+
+def _matches_any(rel_path, name, patterns):
+    return any(fnmatch.fnmatch(rel_path, pattern) or fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+def _walk_pdfs(input_dir, include, exclude):
+    """Depth-first scandir walk yielding PDFs as they are found, without listing the tree first."""
+    stack = [Path(input_dir)]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                subdirs = []
+                for entry in entries:
+                    rel_path = Path(os.path.relpath(entry.path, input_dir)).as_posix()
+                    if entry.is_dir(follow_symlinks=False):
+                        if not _matches_any(rel_path, entry.name, exclude):
+                            subdirs.append(Path(entry.path))
+                    elif entry.name.lower().endswith(".pdf") and entry.is_file():
+                        if include and not _matches_any(rel_path, entry.name, include):
+                            continue
+                        if _matches_any(rel_path, entry.name, exclude):
+                            continue
+                        yield Path(entry.path)
+                stack.extend(reversed(subdirs))
+        except OSError as e:
+            print(f"Error reading directory {directory}: {str(e)}")
+
+def _read_manifest(manifest, include, exclude):
+    """Yield PDF paths listed one per line in a manifest file, or on stdin when manifest is "-"."""
+    handle = sys.stdin if manifest == "-" else open(manifest, "r", encoding="utf-8")
+    try:
+        for line in handle:
+            entry = line.strip()
+            if not entry or entry.startswith("#"):
+                continue
+            pdf_file = Path(entry)
+            if include and not _matches_any(pdf_file.as_posix(), pdf_file.name, include):
+                continue
+            if _matches_any(pdf_file.as_posix(), pdf_file.name, exclude):
+                continue
+            yield pdf_file
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+def discover_pdfs(input_dir, include=None, exclude=None, manifest=None):
+    """Stream PDF paths to process, recursively from input_dir or from a manifest.
+
+    include/exclude are glob patterns matched against the path relative to
+    input_dir and against the file name; excluded directories are not descended.
+    Paths are yielded as soon as they are found so workers can start before the
+    walk finishes.
+    """
+    include = list(include or [])
+    exclude = list(exclude or [])
+    if manifest:
+        return _read_manifest(manifest, include, exclude)
+    return _walk_pdfs(input_dir, include, exclude)
+
+def _output_path(pdf_file, input_dir, output_dir):
+    """Mirror the PDF's location under input_dir so same-named files in subfolders don't collide.
+
+    PDFs outside input_dir (manifest entries) go under _external/<folder name>-<hash of
+    the folder's resolved path>, so same-named files from different folders stay apart.
+    """
+    parent = Path(pdf_file).resolve().parent
+    try:
+        relative_dir = parent.relative_to(Path(input_dir).resolve())
+    except ValueError:
+        digest = hashlib.sha256(str(parent).encode()).hexdigest()[:12]
+        relative_dir = Path(EXTERNAL_OUTPUT_DIR) / f"{parent.name}-{digest}"
+    return Path(output_dir) / relative_dir / f"{Path(pdf_file).stem}.json"
+
+class ResultCache:
+    """SQLite store of extraction results keyed by content hash, evicted least-recently-used by size.
+
+    Triggers keep the total stored size in a one-row cache_size table, so a put checks the
+    size limit without summing the whole table, whichever process wrote the rows.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS results ("
+                          "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                          "size INTEGER NOT NULL, last_used REAL NOT NULL)")
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS cache_size (id INTEGER PRIMARY KEY CHECK (id = 0), "
+                          "total INTEGER NOT NULL)")
+        self.conn.execute("CREATE TRIGGER IF NOT EXISTS results_insert AFTER INSERT ON results BEGIN "
+                          "UPDATE cache_size SET total = total + NEW.size; END")
+        self.conn.execute("CREATE TRIGGER IF NOT EXISTS results_delete AFTER DELETE ON results BEGIN "
+                          "UPDATE cache_size SET total = total - OLD.size; END")
+        self.conn.execute("CREATE TRIGGER IF NOT EXISTS results_resize AFTER UPDATE OF size ON results BEGIN "
+                          "UPDATE cache_size SET total = total + NEW.size - OLD.size; END")
+        # Caches created before the running total existed are summed once.
+        self.conn.execute("INSERT OR IGNORE INTO cache_size (id, total) SELECT 0, COALESCE(SUM(size), 0) FROM results")
+        self.conn.commit()
+
+    def get(self, key):
+        row = self.conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with self.conn:
+            self.conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def get_many(self, keys):
+        """{key: value} for the keys present, marking them used in one transaction."""
+        found = {}
+        keys = list(keys)
+        for offset in range(0, len(keys), 500):
+            chunk = keys[offset:offset + 500]
+            rows = self.conn.execute(f"SELECT key, value FROM results WHERE key IN ({','.join('?' * len(chunk))})",
+                                     chunk)
+            found.update((key, json.loads(value)) for key, value in rows)
+        if found:
+            now = time.time()
+            with self.conn:
+                self.conn.executemany("UPDATE results SET last_used = ? WHERE key = ?",
+                                      [(now, key) for key in found])
+        return found
+
+    def put_many(self, items):
+        rows = []
+        now = time.time()
+        for key, result in items.items():
+            value = json.dumps(result, ensure_ascii=False)
+            rows.append((key, value, len(value), now))
+        with self.conn:
+            self.conn.executemany(RESULT_UPSERT_SQL, rows)
+            self._evict()
+
+    def put(self, key, result):
+        value = json.dumps(result, ensure_ascii=False)
+        with self.conn:
+            self.conn.execute(RESULT_UPSERT_SQL, (key, value, len(value), time.time()))
+            self._evict()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT total FROM cache_size").fetchone()[0]
+        while total > self.max_bytes:
+            oldest = self.conn.execute("SELECT key, size FROM results ORDER BY last_used LIMIT 256").fetchall()
+            if not oldest:
+                break
+            for key, size in oldest:
+                self.conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def close(self):
+        self.conn.close()
+
+# An upsert rather than INSERT OR REPLACE, whose implicit delete would skip the cache_size trigger.
+RESULT_UPSERT_SQL = ("INSERT INTO results (key, value, size, last_used) VALUES (?, ?, ?, ?) "
+                     "ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                     "last_used = excluded.last_used")
+
+_result_caches = {}
+
+def _get_result_cache(cache_path, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+    """One connection per process, opened lazily so pool workers never share a forked handle."""
+    cache = _result_caches.get(cache_path)
+    if cache is None:
+        cache = _result_caches[cache_path] = ResultCache(cache_path, max_bytes)
+    return cache
+
+class PageCandidateStore:
+    """SQLite store of each document page's heading candidates with the page's fingerprint.
+
+    Rows are keyed by (document, extractor configuration, page index), so a revised
+    version of a document only needs its changed pages rescanned. Candidates are kept
+    before the cross-page dedupe, which is redone when they are spliced back in.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS pages ("
+                          "document TEXT NOT NULL, config TEXT NOT NULL, page INTEGER NOT NULL, "
+                          "fingerprint TEXT NOT NULL, candidates TEXT NOT NULL, "
+                          "PRIMARY KEY (document, config, page))")
+        self.conn.commit()
+
+    def load(self, document, config):
+        """{page index: (fingerprint, candidates)} for everything stored about a document."""
+        rows = self.conn.execute("SELECT page, fingerprint, candidates FROM pages WHERE document = ? AND config = ?",
+                                 (document, config))
+        return {page: (fingerprint, candidates) for page, fingerprint, candidates in rows}
+
+    def save(self, document, config, pages, page_count):
+        """Store (page index, fingerprint, candidates) rows and forget pages past the document's end."""
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO pages (document, config, page, fingerprint, candidates) "
+                                  "VALUES (?, ?, ?, ?, ?)",
+                                  [(document, config, page, fingerprint, candidates)
+                                   for page, fingerprint, candidates in pages])
+            self.conn.execute("DELETE FROM pages WHERE document = ? AND config = ? AND page >= ?",
+                              (document, config, page_count))
+
+    def close(self):
+        self.conn.close()
+
+_page_stores = {}
+
+def _get_page_store(path):
+    """One connection per process, as for _get_result_cache."""
+    store = _page_stores.get(path)
+    if store is None:
+        store = _page_stores[path] = PageCandidateStore(path)
+    return store
+
+# Indirect references inside an object's source; /Parent links are dropped so a
+# resource never drags the page tree into its digest.
+_PDF_REFERENCE_RE = re.compile(r'(/Parent\s*)?\b(\d+)\s+(\d+)\s+R\b')
+
+def _object_digest(doc, xref, memo):
+    """Digest of an object and everything it references, independent of xref numbering."""
+    digest = memo.get(xref)
+    if digest is None:
+        memo[xref] = "cycle"
+        source = _resolve_references(doc, doc.xref_object(xref, compressed=True), memo)
+        hasher = hashlib.sha256(source.encode())
+        if doc.xref_is_stream(xref):
+            hasher.update(doc.xref_stream_raw(xref) or b"")
+        digest = memo[xref] = hasher.hexdigest()[:32]
+    return digest
+
+def _resolve_references(doc, source, memo):
+    xref_count = doc.xref_length()
+
+    def resolve(match):
+        if match.group(1):
+            return ""
+        xref = int(match.group(2))
+        return _object_digest(doc, xref, memo) if 0 < xref < xref_count else match.group(0)
+
+    return _PDF_REFERENCE_RE.sub(resolve, source)
+
+def _page_fingerprint(doc, page, memo=None):
+    """Content address of a page: its content streams, resources (fonts, form XObjects and
+    images hashed by content, wherever they live in the file), size and rotation.
+
+    Identical pages get the same fingerprint in different documents. memo caches
+    object digests across the pages of one document.
+    """
+    memo = {} if memo is None else memo
+    digest = hashlib.sha256(page.read_contents())
+    xref = page.xref
+    kind, resources = doc.xref_get_key(xref, "Resources")
+    while kind == "null":
+        kind, parent = doc.xref_get_key(xref, "Parent")
+        if kind != "xref":
+            break
+        xref = int(parent.split()[0])
+        kind, resources = doc.xref_get_key(xref, "Resources")
+    digest.update(_resolve_references(doc, resources, memo).encode())
+    digest.update(f"{tuple(page.rect)}:{page.rotation}".encode())
+    return digest.hexdigest()[:32]
+
+def _file_sha256(pdf_path):
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _result_cache_key(pdf_path, extractor_options=None, scope=None, name=None):
+    """Content hash plus everything else that changes the result: extractor version, options
+    (config files by content), the extraction scope and the rule profiles the file name selects.
+
+    pdf_path may also be in-memory PDF bytes, with name standing in for the file name.
+    """
+    options = dict(extractor_options or {})
+    for option in ("page_store", "document_key", "page_cache"):
+        options.pop(option, None)
+    profiles = load_rule_profiles(options.get("profile_config"))
+    file_name = pdf_path if _is_pdf_path(pdf_path) else _stream_name(None, name)
+    name_markers = [marker for marker, profile in profiles.items() if profile.matches_filename(file_name)]
+    for config_option in ("keyword_config", "profile_config"):
+        if options.get(config_option):
+            options[config_option] = _file_sha256(options[config_option])
+    config = json.dumps({"version": EXTRACTOR_VERSION, "markers": name_markers, "options": options,
+                         "scope": scope or {}}, sort_keys=True)
+    return f"{_source_sha256(pdf_path)}:{hashlib.sha256(config.encode()).hexdigest()[:16]}"
+
+def _process_pdf_file(pdf_path, output_file, job=None, name=None):
+    """Extract one PDF and write its JSON to output_file. Runs in pool workers.
+
+    job holds the per-file settings: page_workers, title_only, pages, metrics, cache_path,
+    cache_max_bytes and extractor_options. With cache_path set, a stored result for
+    identical content is used without opening the PDF. Returns the record
+    {"result", "json_indent", "seconds", "cached"}, plus "output_name" when written,
+    "metrics" (ExtractionMetrics.to_dict() and the profile name) with job["metrics"] and
+    "peak_rss_bytes" in low-memory mode. pdf_path may also be the PDF in memory, named
+    by name.
+    """
+    job = job or {}
+    started = time.perf_counter()
+    if _is_pdf_path(pdf_path):
+        pdf_file = str(pdf_path)
     else:
-        current_dir = Path(__file__).parent
-        input_dir = current_dir / "input"
-        output_dir = current_dir / "output"
-    
-    output_dir.mkdir(parents=True, exist_ok=True)
-    
-    pdf_files = []
-    for i in range(1, 10):
-        pdf_file = input_dir / f"file{i:02d}.pdf"
-        if pdf_file.exists():
-            pdf_files.append(pdf_file)
-    
-    if not pdf_files:
-        print(f"No PDF files found matching pattern file01.pdf, file02.pdf, etc. in {input_dir}")
-        return
+        pdf_file = _pdf_bytes(pdf_path)
+        name = _stream_name(pdf_path, name)
+    cache_path = job.get("cache_path")
+    extractor_options = job.get("extractor_options")
+    scope = {"title_only": job.get("title_only", False), "pages": job.get("pages")}
+    record = None
+    if cache_path:
+        cache = _get_result_cache(cache_path, job.get("cache_max_bytes", DEFAULT_CACHE_MAX_BYTES))
+        cache_key = _result_cache_key(pdf_file, extractor_options, scope, name)
+        record = cache.get(cache_key)
+    if record is None:
+        extractor = PDFOutlineExtractor(pdf_file, name=name, metrics=job.get("metrics", False),
+                                        **(extractor_options or {}))
+        record = {"result": extractor.process_pdf(job.get("page_workers", 1), **scope),
+                  "json_indent": extractor.profile.json_indent}
+        if cache_path:
+            cache.put(cache_key, record)
+        record["cached"] = False
+        if extractor.metrics:
+            record["metrics"] = dict(extractor.metrics.to_dict(), profile=extractor.profile.name)
+        if extractor.peak_rss_bytes is not None:
+            record["peak_rss_bytes"] = extractor.peak_rss_bytes
+    else:
+        record["cached"] = True
+    record["seconds"] = time.perf_counter() - started
     
-    print(f"Found {len(pdf_files)} PDF files to process...")
+    if output_file is None:
+        return record
+    output_file = Path(output_file)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(record["result"], f, indent=record["json_indent"], ensure_ascii=False)
+    record["output_name"] = output_file.name
+    return record
+
+def _report_record(pdf_file, record, collector=None):
+    """Log a finished document's peak memory and metrics, and add it to the collector."""
+    if "peak_rss_bytes" in record:
+        print(f"Peak RSS for {pdf_file.name}: {record['peak_rss_bytes'] / (1 << 20):.1f} MB")
+    if "metrics" in record:
+        counters = record["metrics"]["counters"]
+        skip_rate = ({"page_skip_rate": round(counters.get("pages_skipped", 0) / counters["pages_screened"], 4)}
+                     if counters.get("pages_screened") else {})
+        print(json.dumps(dict(event="document_metrics", path=str(pdf_file), total_seconds=round(record["seconds"], 6),
+                              **skip_rate, **record["metrics"]), separators=(",", ":")))
+    if collector:
+        collector.add(record)
+
+class NDJSONSink:
+    """Streams one compact JSON line per document to a file, or stdout for "-", as results finish."""
+
+    def __init__(self, path):
+        self.path = path
+        if path == "-":
+            self.stream = sys.stdout
+        else:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self.stream = open(path, "w", encoding="utf-8")
+
+    def write(self, pdf_file, record=None, error=None):
+        result = record["result"] if record else {}
+        line = {
+            "path": str(pdf_file),
+            "title": result.get("title"),
+            "outline": result.get("outline"),
+            "timings": dict(record.get("metrics", {}).get("seconds", {}), total=round(record["seconds"], 6))
+                       if record else None,
+            "cached": record["cached"] if record else False,
+            "error": error,
+        }
+        if record and "metrics" in record:
+            line["counters"] = record["metrics"]["counters"]
+            line["rejected"] = record["metrics"]["rejected"]
+        if record and "peak_rss_bytes" in record:
+            line["peak_rss_bytes"] = record["peak_rss_bytes"]
+        self.stream.write(json.dumps(line, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.stream.flush()
+
+    def close(self):
+        if self.stream is not sys.stdout:
+            self.stream.close()
+
+def _start_process_group():
+    """Pool initializer: lead a process group, so _terminate_pool also reaches the page
+    workers a large document spawns under this worker."""
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+
+def _new_batch_pool(workers):
+    return ProcessPoolExecutor(max_workers=workers, initializer=_start_process_group)
+
+def _terminate_pool(executor):
+    """Kill the pool's worker processes, and the page workers under them, so a hung
+    extraction cannot block the batch."""
+    for process in list(getattr(executor, "_processes", {}).values()):
+        if process.is_alive():
+            try:
+                if hasattr(os, "killpg") and os.getpgid(process.pid) == process.pid:
+                    os.killpg(process.pid, signal.SIGTERM)
+                else:
+                    process.terminate()
+            except ProcessLookupError:
+                pass
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def _record_failure(failed, sink, pdf_file, error, collector=None):
+    print(f"Error processing {pdf_file.name}: {error}")
+    failed[str(pdf_file)] = error
+    if sink:
+        sink.write(pdf_file, error=error)
+    if collector:
+        collector.add(error=error)
+
+def run_batch(pdf_files, output_dir, workers=None, timeout=None, max_in_flight=None, input_dir=None,
+              job=None, sink=None, collector=None):
+    """Process PDFs on a process pool and return {"processed": [...], "failed": {path: error}}.
+
+    At most max_in_flight files are submitted at once (default: one per worker), so
+    memory stays flat however many files are queued. With a timeout, no more files
+    than workers are submitted, so every submitted file is running and its clock starts
+    when it starts rather than while it waits in the pool's queue. A file that runs
+    past timeout seconds has its pool torn down and is recorded as failed; the other
+    in-flight files are resubmitted. When a worker crashes, the files that were in flight are
+    retried one at a time so only the PDF that actually crashes is marked failed.
+
+    job is passed to _process_pdf_file. With a sink (NDJSONSink) results and errors are
+    streamed to it instead of being written as one JSON file per PDF. Finished records
+    and failures are also added to collector (MetricsCollector) when given.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max(1, max_in_flight or workers)
+    if timeout:
+        max_in_flight = min(max_in_flight, workers)
+    pending = iter(pdf_files)
+    retry_queue = []
+    suspects = set()
+    in_flight = {}
+    processed = []
+    failed = {}
     
-    for pdf_file in pdf_files:
-        try:
-            print(f"Processing: {pdf_file.name}")
+    executor = _new_batch_pool(workers)
+    try:
+        while True:
+            limit = 1 if suspects else max_in_flight
+            while len(in_flight) < limit:
+                if retry_queue:
+                    pdf_file = retry_queue.pop(0)
+                else:
+                    pdf_file = next(pending, None)
+                    if pdf_file is None:
+                        break
+                print(f"Processing: {pdf_file.name}")
+                output_file = None if sink else str(_output_path(pdf_file, input_dir or pdf_file.parent, output_dir))
+                future = executor.submit(_process_pdf_file, str(pdf_file), output_file, job)
+                in_flight[future] = (pdf_file, time.monotonic())
+            
+            if not in_flight:
+                break
             
-            extractor = PDFOutlineExtractor(str(pdf_file))
-            result = extractor.process_pdf()
+            done, _ = wait(in_flight, timeout=1.0 if timeout else None, return_when=FIRST_COMPLETED)
             
-            output_file = output_dir / f"{pdf_file.stem}.json"
-            with open(output_file, "w", encoding="utf-8") as f:
-                if "file04" in pdf_file.name:
-                    indent = 2
+            broken = []
+            for future in done:
+                pdf_file, _started = in_flight.pop(future)
+                try:
+                    record = future.result()
+                except BrokenProcessPool:
+                    broken.append(pdf_file)
+                    continue
+                except Exception as e:
+                    _record_failure(failed, sink, pdf_file, str(e), collector)
+                    suspects.discard(pdf_file)
+                    continue
+                if sink:
+                    sink.write(pdf_file, record)
+                    output_name = sink.path
                 else:
-                    indent = 4
-                json.dump(result, f, indent=indent, ensure_ascii=False)
+                    output_name = record["output_name"]
+                print(f"Processed {pdf_file.name} -> {output_name}")
+                _report_record(pdf_file, record, collector)
+                processed.append(str(pdf_file))
+                suspects.discard(pdf_file)
             
-            print(f"Processed {pdf_file.name} -> {output_file.name}")
+            if broken:
+                broken.extend(pdf_file for pdf_file, _started in in_flight.values())
+                in_flight.clear()
+                _terminate_pool(executor)
+                executor = _new_batch_pool(workers)
+                if len(broken) == 1 and broken[0] in suspects:
+                    pdf_file = broken[0]
+                    _record_failure(failed, sink, pdf_file, "worker process crashed", collector)
+                    suspects.discard(pdf_file)
+                else:
+                    suspects.update(broken)
+                    retry_queue[:0] = broken
+                continue
             
+            if timeout:
+                now = time.monotonic()
+                expired = [f for f, (_pdf, started) in in_flight.items() if now - started > timeout]
+                if expired:
+                    for future in expired:
+                        pdf_file, _started = in_flight.pop(future)
+                        _record_failure(failed, sink, pdf_file, f"timed out after {timeout}s", collector)
+                        suspects.discard(pdf_file)
+                    retry_queue[:0] = [pdf_file for pdf_file, _started in in_flight.values()]
+                    in_flight.clear()
+                    _terminate_pool(executor)
+                    executor = _new_batch_pool(workers)
+    except BaseException:
+        # Workers lead their own process groups, so Ctrl-C in a terminal does not reach them.
+        _terminate_pool(executor)
+        raise
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    
+    return {"processed": processed, "failed": failed}
+
+def process_pdfs(input_dir=None, output_dir=None, workers=1, timeout=None, max_in_flight=None,
+                 page_workers=1, include=None, exclude=None, manifest=None, cache_path=None,
+                 cache_max_bytes=DEFAULT_CACHE_MAX_BYTES, extractor_options=None, ndjson=None,
+                 title_only=False, pages=None, metrics=False, prometheus=None):
+    """Extract every PDF under input_dir (or listed in manifest) into output_dir or an NDJSON stream.
+
+    metrics logs per-document stage timings and counters as JSON lines; prometheus
+    (implies metrics) writes the run's totals in Prometheus text format to that path.
+    """
+    default_input_dir, default_output_dir = _default_io_dirs()
+    input_dir = Path(input_dir) if input_dir else default_input_dir
+    output_dir = Path(output_dir) if output_dir else default_output_dir
+    
+    sink = NDJSONSink(ndjson) if ndjson else None
+    if not sink:
+        output_dir.mkdir(parents=True, exist_ok=True)
+    
+    pdf_files = discover_pdfs(input_dir, include=include, exclude=exclude, manifest=manifest)
+    job = {"page_workers": page_workers, "title_only": title_only, "pages": pages,
+           "metrics": bool(metrics or prometheus), "cache_path": cache_path, "cache_max_bytes": cache_max_bytes,
+           "extractor_options": extractor_options}
+    collector = MetricsCollector() if prometheus else None
+    
+    # Progress messages must not interleave with NDJSON records on stdout.
+    with contextlib.redirect_stdout(sys.stderr if ndjson == "-" else sys.stdout):
+        try:
+            if workers != 1 or timeout:
+                results = run_batch(pdf_files, output_dir, workers=workers, timeout=timeout,
+                                    max_in_flight=max_in_flight, input_dir=input_dir, job=job, sink=sink,
+                                    collector=collector)
+                file_count = len(results["processed"]) + len(results["failed"])
+            else:
+                file_count = 0
+                for pdf_file in pdf_files:
+                    file_count += 1
+                    try:
+                        print(f"Processing: {pdf_file.name}")
+                        if sink:
+                            record = _process_pdf_file(pdf_file, None, job)
+                            sink.write(pdf_file, record)
+                            output_name = sink.path
+                        else:
+                            record = _process_pdf_file(pdf_file, _output_path(pdf_file, input_dir, output_dir), job)
+                            output_name = record["output_name"]
+                        print(f"Processed {pdf_file.name} -> {output_name}")
+                        _report_record(pdf_file, record, collector)
+                        
+                    except Exception as e:
+                        print(f"Error processing {pdf_file.name}: {str(e)}")
+                        if sink:
+                            sink.write(pdf_file, error=str(e))
+                        if collector:
+                            collector.add(error=str(e))
+                        continue
+        finally:
+            if sink:
+                sink.close()
+            if collector:
+                with open(prometheus, "w", encoding="utf-8") as f:
+                    f.write(collector.prometheus())
+        
+        if not file_count:
+            print(f"No PDF files found in {manifest or input_dir}")
+            return
+        
+        print(f"Handled {file_count} PDF files")
+
+def _warm_service_worker(extractor_options=None):
+    """Load configuration in a fresh pool process so the first real request does not pay for it."""
+    options = extractor_options or {}
+    load_keyword_config(options.get("keyword_config"))
+    load_rule_profiles(options.get("profile_config"))
+    return os.getpid()
+
+def _init_service_worker(extractor_options=None):
+    _start_process_group()
+    _warm_service_worker(extractor_options)
+
+def _service_extract(source, job, name=None):
+    """Extract one request in a pool worker; source is a file path or the PDF's bytes.
+
+    Uploaded bytes are opened from memory and named by name (default document.pdf)
+    for file-name profiles and the file-name title fallback.
+    """
+    return _process_pdf_file(source, None, job, name=name)
+
+class ServiceError(Exception):
+    """A request failure with the HTTP status to answer with."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class ExtractionService:
+    """Long-running HTTP front end (TCP or Unix socket) over a warm extraction process pool.
+
+    POST /extract takes either raw PDF bytes (Content-Type: application/pdf, optionally
+    ?name=file.pdf) or a JSON body {"path": ...}; title_only, pages ("1-20"), max_level ("H1") and deadline
+    (seconds) come from the JSON body or the query string. It answers with
+    {"title", "outline", "cached", "seconds"}. GET /metrics reports queue depth, in-flight
+    work and counters (?format=prometheus for Prometheus text, which with metrics=True
+    also carries extraction stage totals); GET /health answers once the pool is warm.
+
+    At most max_in_flight extractions run at once and at most max_queue requests wait for
+    a slot; beyond that requests are refused with 503. A request that misses its deadline
+    (queue wait included) gets 504, but its slot stays taken until the worker finishes
+    so the limit reflects real load. If that worker is still busy
+    SERVICE_STUCK_GRACE_SECONDS later, the pool is replaced to free the slot; other
+    requests that were running on the old pool get 503 and can be retried.
+    """
+
+    def __init__(self, workers=None, max_in_flight=None, max_queue=DEFAULT_SERVICE_MAX_QUEUE, timeout=None,
+                 job=None, allowed_root=None, max_body_bytes=DEFAULT_SERVICE_MAX_BODY, metrics=False):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max(1, max_in_flight or self.workers)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.job = dict(job or {}, metrics=metrics)
+        self.collector = MetricsCollector() if metrics else None
+        self.allowed_root = Path(allowed_root).resolve() if allowed_root else None
+        self.max_body_bytes = max_body_bytes
+        self.executor = None
+        self._slots = None
+        self._recycled_pools = weakref.WeakSet()
+        self.counters = {"requests": 0, "completed": 0, "failed": 0, "rejected": 0, "timed_out": 0,
+                         "cached": 0, "pool_restarts": 0}
+        self.queued = 0
+        self.in_flight = 0
+        self.peak_queued = 0
+        self.extract_seconds_total = 0.0
+        self.queue_wait_seconds_total = 0.0
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_service_worker,
+                                   initargs=(self.job.get("extractor_options"),))
+
+    async def start(self):
+        """Create the pool and start every worker process before taking requests."""
+        loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self.executor = self._new_pool()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, _warm_service_worker,
+                                                    self.job.get("extractor_options"))
+                               for _ in range(self.workers)))
+
+    def close(self):
+        if self.executor:
+            _terminate_pool(self.executor)
+            self.executor = None
+
+    def metrics(self):
+        return dict(self.counters, queued=self.queued, in_flight=self.in_flight, peak_queued=self.peak_queued,
+                    max_queue=self.max_queue, max_in_flight=self.max_in_flight, workers=self.workers,
+                    extract_seconds_total=round(self.extract_seconds_total, 6),
+                    queue_wait_seconds_total=round(self.queue_wait_seconds_total, 6))
+
+    def prometheus(self):
+        """Service gauges and counters, plus extraction totals when collecting metrics, as Prometheus text."""
+        lines = []
+        for name, value in self.metrics().items():
+            kind = "gauge" if name in ("queued", "in_flight", "peak_queued", "max_queue", "max_in_flight",
+                                       "workers") else "counter"
+            metric = f"pdf_outline_service_{name}" + ("_total" if kind == "counter" and
+                                                      not name.endswith("_total") else "")
+            lines += [f"# TYPE {metric} {kind}", f"{metric} {value}"]
+        text = "\n".join(lines) + "\n"
+        return text + self.collector.prometheus() if self.collector else text
+
+    def _request_job(self, options):
+        """Merge a request's options over the service defaults into a _process_pdf_file job."""
+        job = dict(self.job)
+        job["extractor_options"] = dict(job.get("extractor_options") or {})
+        try:
+            if options.get("title_only") is not None:
+                job["title_only"] = parse_flag(options["title_only"])
+            if options.get("pages"):
+                job["pages"] = parse_page_range(options["pages"])
+            if options.get("max_level"):
+                job["extractor_options"]["max_level"] = parse_heading_level(options["max_level"])
+        except argparse.ArgumentTypeError as e:
+            raise ServiceError(400, str(e))
+        return job
+
+    def _resolve_path(self, path):
+        pdf_path = Path(path).resolve()
+        if self.allowed_root and self.allowed_root not in (pdf_path, *pdf_path.parents):
+            raise ServiceError(403, f"path outside {self.allowed_root}")
+        if not pdf_path.is_file():
+            raise ServiceError(404, f"no such file: {path}")
+        return str(pdf_path)
+
+    async def extract(self, source, options=None):
+        """Run one extraction under the concurrency limit and deadline; returns the record."""
+        options = options or {}
+        job = self._request_job(options)
+        try:
+            deadline = float(options["deadline"]) if options.get("deadline") else self.timeout
+        except (TypeError, ValueError):
+            raise ServiceError(400, f"expected a deadline in seconds, got {options['deadline']!r}")
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self.counters["requests"] += 1
+
+        if self.queued >= self.max_queue:
+            self.counters["rejected"] += 1
+            raise ServiceError(503, "queue full")
+        self.queued += 1
+        self.peak_queued = max(self.peak_queued, self.queued)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), deadline)
+        except asyncio.TimeoutError:
+            self.counters["timed_out"] += 1
+            raise ServiceError(504, "deadline expired while queued")
+        finally:
+            self.queued -= 1
+        self.queue_wait_seconds_total += loop.time() - started
+
+        executor = self.executor
+        self.in_flight += 1
+        future = loop.run_in_executor(executor, _service_extract, source, job, options.get("name"))
+        future.add_done_callback(self._release)
+        remaining = None if deadline is None else max(0.0, deadline - (loop.time() - started))
+        try:
+            record = await asyncio.wait_for(asyncio.shield(future), remaining)
+        except asyncio.TimeoutError:
+            self.counters["timed_out"] += 1
+            loop.call_later(SERVICE_STUCK_GRACE_SECONDS, self._recycle_if_stuck, future, executor)
+            raise ServiceError(504, "deadline expired")
+        except BrokenProcessPool:
+            if executor in self._recycled_pools:
+                raise ServiceError(503, "worker pool restarted after a stuck extraction; retry")
+            self.counters["failed"] += 1
+            if self.collector:
+                self.collector.add(error="worker process crashed")
+            if self.executor is executor:
+                self.counters["pool_restarts"] += 1
+                _terminate_pool(executor)
+                self.executor = self._new_pool()
+            raise ServiceError(500, "worker process crashed")
         except Exception as e:
-            print(f"Error processing {pdf_file.name}: {str(e)}")
-            continue
+            self.counters["failed"] += 1
+            if self.collector:
+                self.collector.add(error=str(e))
+            raise ServiceError(500, str(e))
+        if self.collector:
+            self.collector.add(record)
+        self.counters["completed"] += 1
+        self.counters["cached"] += record["cached"]
+        self.extract_seconds_total += record["seconds"]
+        return record
+
+    def _recycle_if_stuck(self, future, executor):
+        """Replace the pool when a timed-out extraction still holds its worker, as run_batch does."""
+        if future.done() or self.executor is not executor:
+            return
+        self.counters["pool_restarts"] += 1
+        self._recycled_pools.add(executor)
+        self.executor = self._new_pool()
+        _terminate_pool(executor)
+
+    def _release(self, future):
+        self.in_flight -= 1
+        self._slots.release()
+        if not future.cancelled():
+            future.exception()
+
+    async def _read_request(self, reader):
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) != 3:
+            raise ServiceError(400, "malformed request line")
+        method, target, _version = request_line
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length") or 0)
+        if length > self.max_body_bytes:
+            raise ServiceError(413, f"body larger than {self.max_body_bytes} bytes")
+        body = await reader.readexactly(length) if length else b""
+        return method, target, headers, body
+
+    async def _route(self, method, target, headers, body):
+        url = urlsplit(target)
+        if url.path == "/health" and method == "GET":
+            return 200, {"status": "ok"}
+        if url.path == "/metrics" and method == "GET":
+            if parse_qs(url.query).get("format") == ["prometheus"]:
+                return 200, self.prometheus()
+            return 200, self.metrics()
+        if url.path != "/extract":
+            raise ServiceError(404, f"unknown endpoint {url.path}")
+        if method != "POST":
+            raise ServiceError(405, "use POST")
+
+        options = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if headers.get("content-type", "").split(";")[0].strip() == "application/json":
+            try:
+                request = json.loads(body or b"{}")
+            except ValueError as e:
+                raise ServiceError(400, f"invalid JSON: {e}")
+            if not isinstance(request, dict):
+                raise ServiceError(400, "JSON body must be an object")
+            options.update(request)
+            if not isinstance(request.get("path"), str) or not request["path"]:
+                raise ServiceError(400, "JSON requests need a path string")
+            source = self._resolve_path(request["path"])
+        elif body:
+            source = body
+        else:
+            raise ServiceError(400, "send PDF bytes or a JSON body with a path")
+        record = await self.extract(source, options)
+        response = dict(record["result"], cached=record["cached"], seconds=round(record["seconds"], 6))
+        if "metrics" in record:
+            response["metrics"] = record["metrics"]
+        return 200, response
+
+    async def handle(self, reader, writer):
+        try:
+            try:
+                status, payload = await self._route(*await self._read_request(reader))
+            except ServiceError as e:
+                status, payload = e.status, {"error": str(e)}
+            except (ValueError, asyncio.IncompleteReadError) as e:
+                status, payload = 400, {"error": str(e)}
+            if isinstance(payload, str):
+                body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+            else:
+                body, content_type = json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json"
+            writer.write(f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                         f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                         f"Connection: close\r\n\r\n".encode("latin-1") + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve_forever(self, host="127.0.0.1", port=DEFAULT_SERVICE_PORT, unix_path=None):
+        await self.start()
+        try:
+            if unix_path:
+                server = await asyncio.start_unix_server(self.handle, path=unix_path)
+            else:
+                server = await asyncio.start_server(self.handle, host, port)
+            where = unix_path or f"http://{host}:{port}"
+            print(f"Serving on {where} with {self.workers} warm workers", file=sys.stderr)
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+
+def parse_flag(value):
+    """Parse a JSON bool or "1"/"true"/"yes"/"on" / "0"/"false"/"no"/"off" into a bool."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in FLAG_VALUES:
+        return FLAG_VALUES[value.strip().lower()]
+    raise argparse.ArgumentTypeError(f"expected true or false, got {value!r}")
+
+def parse_heading_level(value):
+    """Parse "H2" or "2" into 2."""
+    level = str(value).strip().upper().lstrip("H")
+    if not level.isdigit() or not 1 <= int(level) <= TOC_MAX_LEVEL:
+        raise argparse.ArgumentTypeError(f"expected a level H1-H{TOC_MAX_LEVEL}, got {value!r}")
+    return int(level)
+
+def parse_page_range(value):
+    """Parse "1-20", "5" or "10-" (or a JSON [first, last] pair) into a 1-based inclusive
+    (first, last) tuple, last None for open-ended."""
+    if isinstance(value, (list, tuple)):
+        if (len(value) != 2 or type(value[0]) is not int or
+                (value[1] is not None and type(value[1]) is not int)):
+            raise argparse.ArgumentTypeError(f"expected a page range like [1, 20], got {value!r}")
+        first, last = value
+    else:
+        first, dash, last = str(value).strip().partition("-")
+        try:
+            first = int(first)
+            last = (int(last) if last else None) if dash else first
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"expected a page range like 1-20, got {value!r}")
+    if first < 1 or (last is not None and last < first):
+        raise argparse.ArgumentTypeError(f"expected a page range like 1-20, got {value!r}")
+    return (first, last)
+
+def _parse_batch_args(argv):
+    parser = argparse.ArgumentParser(prog="process_pdfs.py batch",
+                                     description="Process PDFs in parallel on a process pool")
+    parser.add_argument("--input", dest="input_dir", help="Input directory (default: /app/input or ./input)")
+    parser.add_argument("--output", dest="output_dir", help="Output directory (default: /app/output or ./output)")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=None, help="Per-file timeout in seconds")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="Maximum files submitted at once (default: one per worker)")
+    parser.add_argument("--page-workers", type=int, default=1,
+                        help=f"Processes per document for PDFs of {PAGE_PARALLEL_MIN_PAGES}+ pages (default: 1)")
+    parser.add_argument("--include", action="append", default=[], metavar="GLOB",
+                        help="Only process PDFs matching this glob (repeatable)")
+    parser.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                        help="Skip PDFs and directories matching this glob (repeatable)")
+    parser.add_argument("--manifest", help="Read PDF paths from this file, one per line ('-' for stdin)")
+    parser.add_argument("--cache", dest="cache_path", help="SQLite result cache; unchanged PDFs are not re-extracted")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_MAX_BYTES >> 20,
+                        help="Cache size limit in MB before least-recently-used entries are evicted")
+    parser.add_argument("--keywords", dest="keyword_config",
+                        help="JSON file replacing keyword lists (see DEFAULT_KEYWORDS for the list names)")
+    parser.add_argument("--profile", help="Apply this rule profile to every PDF instead of fingerprinting")
+    parser.add_argument("--profiles", dest="profile_config",
+                        help="JSON file of extra rule profiles (format as BUILTIN_RULE_PROFILES)")
+    parser.add_argument("--ndjson", metavar="PATH",
+                        help="Stream one JSON line per PDF to PATH ('-' for stdout) instead of per-file JSON")
+    parser.add_argument("--title-only", action="store_true", help="Extract only the title; skip page scanning")
+    parser.add_argument("--max-level", type=parse_heading_level, metavar="H1-H4",
+                        help="Only keep outline entries at this level or above")
+    parser.add_argument("--pages", type=parse_page_range, metavar="FIRST-LAST",
+                        help="Only scan these 1-based pages for headings, e.g. 1-20 or 5-")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="Release each page's text after scanning it, cap MuPDF's cache and report peak RSS")
+    parser.add_argument("--page-store", metavar="PATH",
+                        help="SQLite store of per-page candidates; revised PDFs only rescan changed pages")
+    parser.add_argument("--page-cache", metavar="PATH",
+                        help="SQLite cache of page layouts and candidates by page content, shared by all PDFs "
+                             "and workers")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Log per-PDF stage timings and counters as JSON lines (and in NDJSON records)")
+    parser.add_argument("--prometheus", metavar="PATH",
+                        help="Write run totals of the metrics in Prometheus text format to PATH (implies --metrics)")
+    return parser.parse_args(argv)
+
+def _parse_evaluate_args(argv):
+    parser = argparse.ArgumentParser(prog="process_pdfs.py evaluate",
+                                     description="Score extraction against reference JSON and measure throughput")
+    parser.add_argument("--input", dest="input_dir", required=True, help="Directory of labeled PDFs")
+    parser.add_argument("--reference", dest="reference_dir", required=True,
+                        help="Reference JSON files, laid out like the input directory")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: CPU count)")
+    parser.add_argument("--output", help="Write the results as JSON here")
+    parser.add_argument("--baseline", help="Earlier --output file to compare against; exits 1 on accuracy loss")
+    parser.add_argument("--tolerance", type=float, default=0.0,
+                        help="Allowed drop in any F1 or accuracy figure before failing (default: 0)")
+    parser.add_argument("--keywords", dest="keyword_config", help="JSON file replacing keyword lists")
+    parser.add_argument("--profile", help="Apply this rule profile to every PDF instead of fingerprinting")
+    parser.add_argument("--profiles", dest="profile_config", help="JSON file of extra rule profiles")
+    return parser.parse_args(argv)
+
+def _parse_bench_args(argv):
+    parser = argparse.ArgumentParser(prog="process_pdfs.py bench",
+                                     description="Time extraction stages on a generated synthetic corpus")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--rounds", type=int, default=3, help="Timed runs per case (default: 3)")
+    parser.add_argument("--case", dest="case_names", action="append", default=[],
+                        help="Only run this case (repeatable): " + ", ".join(case["name"] for case in BENCHMARK_CASES))
+    parser.add_argument("--baseline", help="Earlier results file to compare medians against")
+    parser.add_argument("--save-pdfs", metavar="DIR", help="Also write the generated PDFs here")
+    return parser.parse_args(argv)
+
+def _parse_serve_args(argv):
+    parser = argparse.ArgumentParser(prog="process_pdfs.py serve",
+                                     description="Serve outline extraction over HTTP from a warm process pool")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_SERVICE_PORT,
+                        help=f"TCP port (default: {DEFAULT_SERVICE_PORT})")
+    parser.add_argument("--unix", dest="unix_path", help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: CPU count)")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="Maximum extractions running at once (default: one per worker)")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_SERVICE_MAX_QUEUE,
+                        help="Requests allowed to wait for a slot before new ones get 503")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="Default per-request deadline in seconds, queue wait included")
+    parser.add_argument("--root", dest="allowed_root", help="Only serve path requests for files under this directory")
+    parser.add_argument("--cache", dest="cache_path", help="SQLite result cache shared by all workers")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_MAX_BYTES >> 20,
+                        help="Cache size limit in MB before least-recently-used entries are evicted")
+    parser.add_argument("--keywords", dest="keyword_config", help="JSON file replacing keyword lists")
+    parser.add_argument("--profile", help="Apply this rule profile to every PDF instead of fingerprinting")
+    parser.add_argument("--profiles", dest="profile_config", help="JSON file of extra rule profiles")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Record extraction stage timings and counters (returned per request and in /metrics)")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
     import sys
@@ -1061,8 +3646,51 @@ if __name__ == "__main__":
                     debug_pdf_analysis(file03_path)
                 else:
                     print("file03.pdf not found in input directory")
+        elif sys.argv[1] == "batch":
+            args = _parse_batch_args(sys.argv[2:])
+            log_stream = sys.stderr if args.ndjson == "-" else sys.stdout
+            print("Starting processing pdfs", file=log_stream)
+            process_pdfs(args.input_dir, args.output_dir, workers=args.workers or None,
+                         timeout=args.timeout, max_in_flight=args.max_in_flight,
+                         page_workers=args.page_workers, include=args.include,
+                         exclude=args.exclude, manifest=args.manifest, cache_path=args.cache_path,
+                         cache_max_bytes=args.cache_size << 20,
+                         extractor_options={"keyword_config": args.keyword_config, "profile": args.profile,
+                                            "profile_config": args.profile_config, "max_level": args.max_level,
+                                            "low_memory": args.low_memory, "page_store": args.page_store,
+                                            "page_cache": args.page_cache},
+                         ndjson=args.ndjson, title_only=args.title_only, pages=args.pages,
+                         metrics=args.metrics, prometheus=args.prometheus)
+            print("completed processing pdfs", file=log_stream)
+        elif sys.argv[1] == "serve":
+            args = _parse_serve_args(sys.argv[2:])
+            service = ExtractionService(workers=args.workers or None, max_in_flight=args.max_in_flight,
+                                        max_queue=args.max_queue, timeout=args.timeout,
+                                        allowed_root=args.allowed_root, metrics=args.metrics,
+                                        job={"cache_path": args.cache_path, "cache_max_bytes": args.cache_size << 20,
+                                             "extractor_options": {"keyword_config": args.keyword_config,
+                                                                   "profile": args.profile,
+                                                                   "profile_config": args.profile_config}})
+            try:
+                asyncio.run(service.serve_forever(args.host, args.port, args.unix_path))
+            except KeyboardInterrupt:
+                pass
         elif sys.argv[1] in ["validate", "validation", "test"]:
             test_validation_logic()
+        elif sys.argv[1] in ["bench-classifier", "classifier-benchmark"]:
+            benchmark_line_classifier()
+        elif sys.argv[1] in ["evaluate", "evaluation"]:
+            args = _parse_evaluate_args(sys.argv[2:])
+            passed = evaluate_corpus(args.input_dir, args.reference_dir, workers=args.workers or None,
+                                     job={"extractor_options": {"keyword_config": args.keyword_config,
+                                                                "profile": args.profile,
+                                                                "profile_config": args.profile_config}},
+                                     output_path=args.output, baseline_path=args.baseline, tolerance=args.tolerance)
+            sys.exit(0 if passed else 1)
+        elif sys.argv[1] in ["bench", "benchmark"]:
+            args = _parse_bench_args(sys.argv[2:])
+            run_benchmarks(args.output, rounds=args.rounds, case_names=args.case_names,
+                           baseline_path=args.baseline, save_pdfs=args.save_pdfs)
         elif sys.argv[1] in ["analyze", "analysis"]:
             if len(sys.argv) > 2:
                 analyze_specific_file(sys.argv[2])
@@ -1101,11 +3729,16 @@ if __name__ == "__main__":
             print()
             print("Usage:")
             print("  python process_pdfs.py                         # Normal processing mode")
+            print("  python process_pdfs.py batch [options]         # Parallel processing (see batch --help)")
+            print("  python process_pdfs.py serve [options]         # HTTP service on a warm pool (see serve --help)")
             print("  python process_pdfs.py debug                   # Debug file03.pdf")
             print("  python process_pdfs.py debug <pdf_file>        # Debug specific file")
             print("  python process_pdfs.py validate                # Test validation logic")
+            print("  python process_pdfs.py bench-classifier        # Benchmark heading line classifier")
+            print("  python process_pdfs.py bench [options]         # Benchmark stages on a synthetic corpus")
             print("  python process_pdfs.py analyze <pdf_file>      # Analyze PDF structure")
             print("  python process_pdfs.py compare <json_file>     # Compare output with reference")
+            print("  python process_pdfs.py evaluate [options]      # Accuracy and throughput on a labeled corpus")
             print("  python process_pdfs.py debug-pages <pdf_file>  # Debug page enumeration")
             print("  python process_pdfs.py debug-headings <file>   # Debug heading detection")
             print("  python process_pdfs.py find-ontario            # Find Ontario's Digital Library")